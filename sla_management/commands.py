@@ -0,0 +1,70 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+import click
+from frappe.commands import pass_context
+
+
+@click.command("run-sla-checks")
+@click.option("--job", type=click.Choice(["checker", "summary"]), default="checker", help="SLA job to run")
+@click.option("--concurrency", type=int, default=2, help="Maximum sites processed at the same time")
+@click.option("--stagger", type=float, default=5, help="Minimum seconds between two site starts")
+@pass_context
+def run_sla_checks(context, job, concurrency, stagger):
+	"""
+	Run SLA jobs for the given sites in one process. Use `bench --site all`
+	for every site; without --site bench picks only the default site.
+	"""
+	from frappe.exceptions import SiteNotSpecifiedError
+
+	from sla_management.scripts.sla_bench_runner import run_for_sites
+
+	sites = context.sites
+	if not sites:
+		raise SiteNotSpecifiedError
+	timings = run_for_sites(sites, job=job, max_concurrent=concurrency, stagger_seconds=stagger)
+
+	total = 0.0
+	for t in timings:
+		total += t.seconds
+		status = "skipped" if t.skipped else (f"failed: {t.error}" if t.error else f"result: {t.result}")
+		click.echo(f"{t.site:<40} {t.seconds:8.2f}s  {status}")
+	click.echo(f"{len(timings)} sites, {total:.2f}s site time")
+
+	if any(t.error for t in timings):
+		raise SystemExit(1)
+
+
+@click.command("sla-check-indexes")
+@click.option("--fix", is_flag=True, default=False, help="Create missing SLA indexes first")
+@pass_context
+def sla_check_indexes(context, fix):
+	"""EXPLAIN the hot SLA queries and warn when one is not using an index"""
+	import frappe
+
+	from sla_management.utils.indexes import check_sla_indexes, ensure_sla_indexes
+
+	failed = False
+	for site in context.sites:
+		frappe.init(site=site)
+		frappe.connect()
+		try:
+			if fix:
+				ensure_sla_indexes()
+				frappe.db.commit()
+
+			click.echo(site)
+			for result in check_sla_indexes():
+				failed = failed or not result.uses_index
+				status = "ok" if result.uses_index else "WARNING: no index"
+				click.echo(f"  {result.label:<32} {status}")
+				if not result.uses_index:
+					click.echo(f"    {result.detail}")
+		finally:
+			frappe.destroy()
+
+	if failed:
+		raise SystemExit(1)
+
+
+commands = [run_sla_checks, sla_check_indexes]
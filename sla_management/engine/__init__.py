@@ -0,0 +1,27 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+"""
+Framework-independent SLA evaluation engine.
+
+`core` holds the pure-Python logic (rule scopes, classification, breach
+planning). Backends supply records and persist decisions:
+
+- `frappe_backend.FrappeBackend` - production path used by the hourly checker
+- `sqlite_backend.SQLiteBackend` - in-memory / file SQLite stand-in for tests,
+  profiling and benchmarks without a Frappe site
+"""
+
+from sla_management.engine.core import (
+	AT_RISK,
+	BREACHED,
+	ON_TRACK,
+	Breach,
+	RecordState,
+	classify_sla,
+	evaluate_rules,
+	index_rules,
+	parse_warning_thresholds,
+	plan_breach_logs,
+	run,
+)
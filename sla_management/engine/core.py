@@ -0,0 +1,338 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+"""
+Pure-Python SLA evaluation core. Must not import frappe.
+
+Rules, records and hierarchy rows are plain mappings. A backend provides them:
+
+Read side (may be served by a read replica, see `read_phase`):
+	read_phase()                                   -> context manager
+	get_active_rules()                             -> iterable of rules
+	get_records(doctype, vertical, statuses, start_field)
+	                                               -> iterable of {name, owner, status, vertical, sla_start}
+	get_lead_opportunities(lead_names)             -> {lead name: first opportunity creation}
+	get_hierarchy(emails)                          -> iterable of {email, department, reporting_manager_email}
+
+Write side (always the primary):
+	get_existing_breach_keys(record_ids)           -> iterable of (record_id, stage, vertical, manager email)
+	upsert_states(states, now)
+	insert_breach_logs(breach, entries, now)       entries: [(vertical, manager email), ...]
+	notify(breach)
+	finish()                                       end of run, flush buffered side effects
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import NamedTuple
+
+ON_TRACK, AT_RISK, BREACHED = "On Track", "At Risk", "Breached"
+SEVERITY = {ON_TRACK: 0, AT_RISK: 1, BREACHED: 2}
+
+# Rule kinds, see get_rule_scope
+NEW, CONVERTED, MULTI_STATUS, STAGE = "New", "Converted", "Multi Status", "Stage"
+
+
+class RuleScope(NamedTuple):
+	kind: str
+	doctype: str
+	statuses: tuple
+	start_field: str
+
+
+@dataclass
+class Breach:
+	rule: str
+	message: str
+	doctype: str
+	record_id: str
+	owner: str
+	vertical: str
+	log_stage: str
+	notify_stage: str
+	sla_start: datetime
+	hrs_spent: float
+	hrs_exceeded: float
+
+
+@dataclass
+class RecordState:
+	doctype_name: str
+	record_id: str
+	vertical: str
+	stage: str
+	sla_rule: str
+	sla_status: str
+	threshold: float
+	hours_spent: float
+	max_hours_allowed: float
+	last_stage_change_on: datetime
+
+
+@dataclass
+class EvaluationResult:
+	breaches: list
+	states: dict
+
+
+def parse_warning_thresholds(value):
+	"""
+	Parse the comma-separated `warning_thresholds` field of SLA Rule.
+
+	Returns a sorted list of percentages, e.g. "90, 75" -> [75.0, 90.0]
+	"""
+	thresholds = []
+	for part in (value or "").split(","):
+		part = part.strip().rstrip("%").strip()
+		if part:
+			thresholds.append(float(part))
+	return sorted(set(thresholds))
+
+
+def get_rule_thresholds(rule):
+	try:
+		return parse_warning_thresholds(rule.get("warning_thresholds"))
+	except ValueError:
+		return []
+
+
+def classify_sla(hrs_spent, max_hrs, thresholds):
+	"""Returns (sla_status, threshold crossed) - On Track / At Risk / Breached"""
+	if hrs_spent > max_hrs:
+		return BREACHED, 100
+	if max_hrs:
+		used = hrs_spent * 100.0 / max_hrs
+		crossed = [t for t in thresholds if used >= t]
+		if crossed:
+			return AT_RISK, crossed[-1]
+	return ON_TRACK, 0
+
+
+def hours_between(end, start):
+	return (as_datetime(end) - as_datetime(start)).total_seconds() / 3600.0
+
+
+def as_datetime(value):
+	if isinstance(value, str):
+		return datetime.fromisoformat(value)
+	return value
+
+
+def get_rule_scope(rule):
+	"""
+	Which records a rule looks at and where its SLA clock starts.
+
+	- Lead "New": creation
+	- Lead "Converted": modified (conversion time) until the first Opportunity
+	- Lead "Working"/"Nurturing" (comma-separated): creation
+	- Opportunity <status>: modified
+
+	Returns None for rules the engine does not evaluate.
+	"""
+	stage = rule.get("stage_value") or ""
+
+	if rule.get("applies_to") == "Lead":
+		if stage == "New":
+			return RuleScope(NEW, "Lead", ("New",), "creation")
+		if stage == "Converted":
+			return RuleScope(CONVERTED, "Lead", ("Converted",), "modified")
+		if "Working" in stage or "Nurturing" in stage:
+			statuses = tuple(s.strip() for s in stage.split(",") if s.strip())
+			return RuleScope(MULTI_STATUS, "Lead", statuses, "creation")
+
+	elif rule.get("applies_to") == "Opportunity":
+		return RuleScope(STAGE, "Opportunity", (stage,), "modified")
+
+	return None
+
+
+def index_rules(rules):
+	"""
+	{(applies_to, vertical, stage): [rules]} for O(1) lookup of the rules
+	covering a record. Comma-separated stage values are indexed per stage.
+	"""
+	index = {}
+	for rule in rules:
+		scope = get_rule_scope(rule)
+		if scope:
+			stages = scope.statuses
+		else:
+			stages = [s.strip() for s in (rule.get("stage_value") or "").split(",") if s.strip()]
+		for stage in stages:
+			index.setdefault((rule.get("applies_to"), rule.get("vertical"), stage), []).append(rule)
+	return index
+
+
+@dataclass
+class Evaluation:
+	rule: dict
+	scope: RuleScope
+	record: dict
+	log_stage: str
+	notify_stage: str
+	sla_start: datetime
+	hrs_spent: float
+	sla_status: str
+	threshold: float
+
+
+def evaluate_records(rules, backend, now):
+	"""
+	Classify every record in scope of `rules` as On Track / At Risk / Breached
+	in a single pass over each record bucket. Yields one Evaluation per rule and
+	record.
+	"""
+	buckets = {}
+
+	for rule in rules:
+		scope = get_rule_scope(rule)
+		if not scope:
+			continue
+
+		bucket_key = (scope.doctype, rule.get("vertical"), scope.statuses, scope.start_field)
+		if bucket_key not in buckets:
+			buckets[bucket_key] = list(backend.get_records(*bucket_key))
+		records = buckets[bucket_key]
+
+		opportunities = {}
+		if scope.kind == CONVERTED and records:
+			opportunities = backend.get_lead_opportunities([r["name"] for r in records])
+
+		max_hrs = rule.get("max_hours_allowed") or 0
+		thresholds = get_rule_thresholds(rule)
+		for record in records:
+			sla_start = as_datetime(record["sla_start"])
+			log_stage = notify_stage = rule.get("stage_value") or ""
+			record_thresholds = thresholds
+			end = now
+
+			if scope.kind == NEW:
+				log_stage = notify_stage = "New"
+			elif scope.kind == MULTI_STATUS:
+				log_stage = notify_stage = record["status"]
+			elif scope.kind == CONVERTED:
+				log_stage, notify_stage = "Converted", "Converted (Missing Opp)"
+				if record["name"] in opportunities:
+					# Opportunity exists - it can only have breached, not be at risk
+					end = opportunities[record["name"]]
+					record_thresholds = []
+
+			hrs_spent = hours_between(end, sla_start)
+			sla_status, threshold = classify_sla(hrs_spent, max_hrs, record_thresholds)
+			yield Evaluation(rule, scope, record, log_stage, notify_stage, sla_start, hrs_spent, sla_status, threshold)
+
+
+def evaluate_rules(rules, backend, now):
+	"""
+	Returns breaches (one per rule and record) and the worst At Risk/Breached
+	state per record, keyed by (doctype, record_id).
+	"""
+	result = EvaluationResult(breaches=[], states={})
+	for evaluation in evaluate_records(rules, backend, now):
+		if evaluation.sla_status != ON_TRACK:
+			_track(result, evaluation)
+	return result
+
+
+def _track(result, ev):
+	rule, record = ev.rule, ev.record
+	max_hrs = rule.get("max_hours_allowed") or 0
+
+	# A record can match several rules, keep the worst status
+	key = (ev.scope.doctype, record["name"])
+	existing = result.states.get(key)
+	if not existing or SEVERITY[ev.sla_status] > SEVERITY[existing.sla_status]:
+		result.states[key] = RecordState(
+			doctype_name=ev.scope.doctype,
+			record_id=record["name"],
+			vertical=record.get("vertical"),
+			stage=ev.log_stage,
+			sla_rule=rule.get("name"),
+			sla_status=ev.sla_status,
+			threshold=ev.threshold,
+			hours_spent=ev.hrs_spent,
+			max_hours_allowed=max_hrs,
+			last_stage_change_on=ev.sla_start,
+		)
+
+	if ev.sla_status == BREACHED:
+		result.breaches.append(Breach(
+			rule=rule.get("name"),
+			message=rule.get("message"),
+			doctype=ev.scope.doctype,
+			record_id=record["name"],
+			owner=record.get("owner"),
+			vertical=record.get("vertical"),
+			log_stage=ev.log_stage,
+			notify_stage=ev.notify_stage,
+			sla_start=ev.sla_start,
+			hrs_spent=ev.hrs_spent,
+			hrs_exceeded=ev.hrs_spent - max_hrs,
+		))
+
+
+def _normalize(*values):
+	# Mirrors the database's case- and trailing-space-insensitive comparison
+	return tuple((v or "").strip().lower() for v in values)
+
+
+def build_hierarchy_map(hierarchy_rows):
+	"""Group hierarchy rows by (employee email, department)"""
+	hierarchy_map = {}
+	for row in hierarchy_rows:
+		hierarchy_map.setdefault(_normalize(row.get("email"), row.get("department")), []).append(row)
+	return hierarchy_map
+
+
+def plan_breach_logs(breaches, hierarchy_rows, existing_keys):
+	"""
+	Expand breaches into breach log entries, one per reporting manager, and drop
+	entries already logged.
+
+	Yields (breach, [(vertical, manager email), ...]) for breaches with at least
+	one new entry.
+	"""
+	hierarchy_map = build_hierarchy_map(hierarchy_rows)
+	existing = {_normalize(*key) for key in existing_keys}
+
+	for breach in breaches:
+		managers = hierarchy_map.get(_normalize(breach.owner, breach.vertical)) if breach.owner else None
+		if not managers:
+			managers = [{"reporting_manager_email": "", "department": breach.vertical}]
+
+		entries = []
+		for row in managers:
+			mgr_email = row.get("reporting_manager_email") or ""
+			vertical = row.get("department") or breach.vertical
+			key = _normalize(breach.record_id, breach.log_stage, vertical, mgr_email)
+			if key in existing:
+				continue
+			existing.add(key)
+			entries.append((vertical, mgr_email))
+
+		if entries:
+			yield breach, entries
+
+
+def run(backend, now):
+	"""
+	One full SLA check: bulk reads, classification, dedup and writes.
+
+	Returns the number of records that got new breach log entries.
+	"""
+	with backend.read_phase():
+		rules = list(backend.get_active_rules())
+		result = evaluate_rules(rules, backend, now)
+		hierarchy = list(backend.get_hierarchy({b.owner for b in result.breaches if b.owner}))
+
+	existing = backend.get_existing_breach_keys({b.record_id for b in result.breaches})
+	backend.upsert_states(result.states.values(), now)
+
+	total = 0
+	for breach, entries in plan_breach_logs(result.breaches, hierarchy, existing):
+		backend.insert_breach_logs(breach, entries, now)
+		backend.notify(breach)
+		total += 1
+
+	backend.finish()
+	return total
@@ -0,0 +1,269 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+from dataclasses import asdict
+
+import frappe
+from frappe.utils import add_to_date
+
+from sla_management.engine import core
+from sla_management.sla_management.doctype.sla_record_state.sla_record_state import get_state_name
+from sla_management.utils import rule_registry
+from sla_management.utils.breach_counters import BreachCounter
+from sla_management.utils.replica import replica_reads
+
+# Max names per IN (...) clause
+CHUNK_SIZE = 500
+
+STATE_FIELDS = [
+	"doctype_name",
+	"record_id",
+	"vertical",
+	"stage",
+	"sla_rule",
+	"sla_status",
+	"threshold",
+	"hours_spent",
+	"max_hours_allowed",
+	"last_stage_change_on",
+]
+
+
+def chunked(values, size=CHUNK_SIZE):
+	values = list(values)
+	for i in range(0, len(values), size):
+		yield values[i : i + size]
+
+
+def send_sla_notification(user, doctype, docname, stage, hours_spent, hours_exceeded):
+	"""Notification Log entry for the record owner"""
+	try:
+		noti = frappe.new_doc("Notification Log")
+		noti.for_user = user
+		noti.type = "Alert"
+		noti.document_type = doctype
+		noti.document_name = docname
+		noti.subject = f"SLA Breach: {docname}"
+		noti.email_content = f"Record '{docname}' stuck in '{stage}' for {hours_spent:.1f} hrs."
+		noti.insert(ignore_permissions=True)
+	except Exception as e:
+		frappe.logger().error(f"SLA Notification failed: {e}")
+
+
+class FrappeBackend:
+	"""
+	SLA engine backend for a connected Frappe site.
+
+	Pass `doctype` and `record_names` to evaluate only those records (used by the
+	chunked re-evaluation after an SLA Rule change).
+	"""
+
+	def __init__(self, doctype=None, record_names=None):
+		self.doctype = doctype
+		self.record_names = record_names
+		self.counters = BreachCounter()
+
+	def read_phase(self):
+		return replica_reads()
+
+	# Read side
+
+	def get_active_rules(self):
+		return rule_registry.get_active_rules()
+
+	def get_records(self, doctype, vertical, statuses, start_field):
+		filters = {"custom_vertical": vertical, "status": ["in", list(statuses)]}
+		if self.record_names is not None:
+			if doctype != self.doctype:
+				return []
+			filters["name"] = ["in", self.record_names]
+
+		return frappe.get_all(
+			doctype,
+			filters=filters,
+			fields=["name", "owner", "status", "custom_vertical as vertical", f"{start_field} as sla_start"],
+		)
+
+	def get_lead_opportunities(self, lead_names):
+		opportunities = {}
+		for names in chunked(lead_names):
+			for row in frappe.get_all(
+				"Opportunity",
+				filters={"opportunity_from": "Lead", "party_name": ["in", names]},
+				fields=["party_name", "min(creation) as creation"],
+				group_by="party_name",
+			):
+				opportunities[row.party_name] = row.creation
+		return opportunities
+
+	def get_hierarchy(self, emails):
+		emails = list({e.strip() for e in emails if e})
+		rows = []
+		for chunk in chunked(emails):
+			rows.extend(
+				frappe.get_all(
+					"CRM Reporting Hierarchy",
+					filters={"email": ["in", chunk]},
+					fields=["email", "department", "reporting_manager_email"],
+				)
+			)
+		return rows
+
+	def get_record_names(self, rule):
+		"""Names of all records in scope of `rule`, for chunked re-evaluation"""
+		scope = core.get_rule_scope(rule)
+		if not scope:
+			return []
+		return frappe.get_all(
+			scope.doctype,
+			filters={"custom_vertical": rule.vertical, "status": ["in", list(scope.statuses)]},
+			pluck="name",
+			order_by="name asc",
+		)
+
+	def count_rule_impact(self, rule, now):
+		"""
+		Count-only preview of `rule`: records in scope, breaching, breaching without
+		a breach log yet, and at risk (lowest warning threshold).
+		"""
+		scope = core.get_rule_scope(rule)
+		if not scope:
+			return None
+
+		max_hours = rule.get("max_hours_allowed") or 0
+		thresholds = core.get_rule_thresholds(rule)
+		risk_hours = max_hours * thresholds[0] / 100 if thresholds else max_hours
+		values = {
+			"vertical": rule.get("vertical"),
+			"statuses": scope.statuses,
+			"cutoff": add_to_date(now, hours=-max_hours),
+			"risk_cutoff": add_to_date(now, hours=-risk_hours),
+			"max_seconds": max_hours * 3600,
+		}
+
+		join = ""
+		breach = f"t.`{scope.start_field}` < %(cutoff)s"
+		at_risk = f"t.`{scope.start_field}` < %(risk_cutoff)s and not ({breach})" if thresholds else "1 = 0"
+		if scope.kind == core.CONVERTED:
+			join = """left join (
+				select party_name, min(creation) as first_opportunity from `tabOpportunity`
+				where opportunity_from = 'Lead' group by party_name
+			) o on o.party_name = t.name"""
+			opp_elapsed = (
+				"extract(epoch from o.first_opportunity - t.modified)"
+				if frappe.db.db_type == "postgres"
+				else "timestampdiff(second, t.modified, o.first_opportunity)"
+			)
+			breach = f"""((o.first_opportunity is null and t.modified < %(cutoff)s)
+				or (o.first_opportunity is not null and {opp_elapsed} > %(max_seconds)s))"""
+			if thresholds:
+				at_risk = f"o.first_opportunity is null and t.modified < %(risk_cutoff)s and not ({breach})"
+
+		row = frappe.db.sql(
+			f"""select
+				count(*) as in_stage,
+				coalesce(sum(case when {breach} then 1 else 0 end), 0) as breaching,
+				coalesce(sum(case when {breach} and not exists (
+					select 1 from `tabSLA Breach Log` b where b.record_id = t.name and b.stage = t.status
+				) then 1 else 0 end), 0) as new_breaches,
+				coalesce(sum(case when {at_risk} then 1 else 0 end), 0) as at_risk
+			from `tab{scope.doctype}` t {join}
+			where t.custom_vertical = %(vertical)s and t.status in %(statuses)s""",
+			values,
+			as_dict=True,
+		)[0]
+		return frappe._dict({k: int(v or 0) for k, v in row.items()})
+
+	# Write side
+
+	def get_existing_breach_keys(self, record_ids):
+		keys = []
+		for chunk in chunked(record_ids):
+			keys.extend(
+				frappe.get_all(
+					"SLA Breach Log",
+					filters={"record_id": ["in", chunk]},
+					fields=["record_id", "stage", "vertical", "reporting_manager_email"],
+					as_list=True,
+				)
+			)
+		return keys
+
+	def upsert_states(self, states, now):
+		"""Existing rows are bulk updated, new rows bulk inserted, rows not seen in this run deleted"""
+		rows = {get_state_name(s.doctype_name, s.record_id): asdict(s) for s in states}
+
+		existing = set()
+		for chunk in chunked(rows):
+			existing.update(
+				frappe.get_all("SLA Record State", filters={"name": ["in", chunk]}, pluck="name")
+			)
+
+		updates = {
+			name: dict({f: row[f] for f in STATE_FIELDS}, evaluated_on=now)
+			for name, row in rows.items()
+			if name in existing
+		}
+		if updates:
+			frappe.db.bulk_update("SLA Record State", updates, chunk_size=CHUNK_SIZE)
+
+		user = frappe.session.user
+		inserts = [
+			(name, now, now, user, user, *[row[f] for f in STATE_FIELDS], now)
+			for name, row in rows.items()
+			if name not in existing
+		]
+		if inserts:
+			frappe.db.bulk_insert(
+				"SLA Record State",
+				["name", "creation", "modified", "owner", "modified_by", *STATE_FIELDS, "evaluated_on"],
+				inserts,
+				# A row inserted by an overlapping run must not abort this one
+				ignore_duplicates=True,
+				chunk_size=CHUNK_SIZE,
+			)
+
+		# Records not At Risk/Breached in this run are On Track again
+		stale = {"evaluated_on": ["<", now]}
+		if self.record_names is not None:
+			stale.update(doctype_name=self.doctype, record_id=["in", self.record_names])
+		frappe.db.delete("SLA Record State", stale)
+		frappe.db.commit()
+
+	def insert_breach_logs(self, breach, entries, now):
+		for vertical, mgr_email in entries:
+			frappe.get_doc(
+				{
+					"doctype": "SLA Breach Log",
+					"vertical": vertical,
+					"doctype_name": breach.doctype,
+					"record_id": breach.record_id,
+					"breached_by": breach.owner,
+					"stage": breach.log_stage,
+					"hours_exceeded": breach.hrs_exceeded / 24.0,  # stored in days
+					"last_stage_change_on": breach.sla_start,
+					"breached_on": now,
+					"reporting_manager_email": mgr_email,
+					"message": breach.message,
+				}
+			).insert(ignore_permissions=True)
+		frappe.db.commit()
+
+		try:
+			for vertical, _mgr_email in entries:
+				self.counters.add(vertical, breach.log_stage)
+		except Exception:
+			# add() may flush mid-run; the logs are committed, the notification must still go out
+			frappe.log_error(title="SLA breach counters update failed")
+
+	def notify(self, breach):
+		send_sla_notification(
+			breach.owner, breach.doctype, breach.record_id, breach.notify_stage, breach.hrs_spent, breach.hrs_exceeded
+		)
+
+	def finish(self):
+		try:
+			self.counters.flush(force=True)
+		except Exception:
+			# Live counters are best effort, never fail the SLA run for them
+			frappe.log_error(title="SLA breach counters update failed")
@@ -0,0 +1,135 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+"""
+Columnar snapshot of open SLA state for offline analytics.
+
+Writes one file per vertical under a Hive-style layout:
+
+	<base_dir>/date=2026-01-10/vertical=permanent_staffing/part-0.arrow
+
+Arrow IPC files are written uncompressed so they can be memory-mapped and read
+without copies (`pyarrow.ipc.open_file(pyarrow.memory_map(path))`). Parquet is
+available for smaller files. Requires `pyarrow` (`pip install sla_management[analytics]`).
+"""
+
+import os
+import re
+import shutil
+from datetime import timedelta
+
+from sla_management.engine.core import evaluate_records
+
+FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+
+def get_schema():
+	import pyarrow as pa
+
+	return pa.schema(
+		[
+			("doctype", pa.string()),
+			("record_id", pa.string()),
+			("vertical", pa.string()),
+			("stage", pa.string()),
+			("owner", pa.string()),
+			("sla_rule", pa.string()),
+			("sla_start", pa.timestamp("s")),
+			("elapsed_hours", pa.float64()),
+			("max_hours_allowed", pa.float64()),
+			("sla_status", pa.string()),
+			("threshold", pa.float64()),
+			("breach_logged", pa.bool_()),
+			("snapshot_on", pa.timestamp("s")),
+		]
+	)
+
+
+def partition_slug(value):
+	return re.sub(r"[^a-z0-9]+", "_", (value or "none").lower()).strip("_") or "none"
+
+
+def build_partitions(rules, backend, now):
+	"""Evaluate all open records and group snapshot rows by vertical"""
+	rules = list(rules)
+	rows = []
+	for ev in evaluate_records(rules, backend, now):
+		rows.append(
+			{
+				"doctype": ev.scope.doctype,
+				"record_id": ev.record["name"],
+				"vertical": ev.record.get("vertical"),
+				"stage": ev.log_stage,
+				"owner": ev.record.get("owner"),
+				"sla_rule": ev.rule.get("name"),
+				"sla_start": ev.sla_start,
+				"elapsed_hours": ev.hrs_spent,
+				"max_hours_allowed": ev.rule.get("max_hours_allowed") or 0,
+				"sla_status": ev.sla_status,
+				"threshold": ev.threshold,
+				"snapshot_on": now,
+			}
+		)
+
+	logged = {
+		(key[0], key[1])
+		for key in backend.get_existing_breach_keys({r["record_id"] for r in rows})
+	}
+
+	partitions = {}
+	for row in rows:
+		row["breach_logged"] = (row["record_id"], row["stage"]) in logged
+		partitions.setdefault(row["vertical"], []).append(row)
+	return partitions
+
+
+def write_snapshot(partitions, base_dir, now, fmt="arrow"):
+	"""
+	Write `partitions` ({vertical: rows}) for the day of `now`. Files are written
+	to a temporary directory that is renamed into place; an existing snapshot
+	for the same day is renamed aside first. Returns the day directory.
+	"""
+	import pyarrow as pa
+
+	if fmt not in FORMATS:
+		raise ValueError(f"Unknown snapshot format {fmt}")
+
+	schema = get_schema()
+	day_dir = os.path.join(base_dir, f"date={now.date().isoformat()}")
+	tmp_dir = day_dir + ".tmp"
+	shutil.rmtree(tmp_dir, ignore_errors=True)
+
+	for vertical, rows in partitions.items():
+		part_dir = os.path.join(tmp_dir, f"vertical={partition_slug(vertical)}")
+		os.makedirs(part_dir, exist_ok=True)
+		table = pa.Table.from_pylist(rows, schema=schema)
+		path = os.path.join(part_dir, "part-0" + FORMATS[fmt])
+
+		if fmt == "parquet":
+			import pyarrow.parquet as pq
+
+			pq.write_table(table, path)
+		else:
+			with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+				writer.write_table(table)
+
+	os.makedirs(tmp_dir, exist_ok=True)
+	# Move a same-day snapshot aside instead of deleting it first, so readers are
+	# only without one between the two renames
+	old_dir = day_dir + ".old"
+	shutil.rmtree(old_dir, ignore_errors=True)
+	if os.path.isdir(day_dir):
+		os.replace(day_dir, old_dir)
+	os.replace(tmp_dir, day_dir)
+	shutil.rmtree(old_dir, ignore_errors=True)
+	return day_dir
+
+
+def prune_snapshots(base_dir, now, retention_days):
+	"""Delete day directories older than `retention_days`"""
+	if not os.path.isdir(base_dir):
+		return
+	oldest = (now - timedelta(days=retention_days)).date().isoformat()
+	for entry in os.listdir(base_dir):
+		if entry.startswith("date=") and not entry.endswith((".tmp", ".old")) and entry[5:] < oldest:
+			shutil.rmtree(os.path.join(base_dir, entry), ignore_errors=True)
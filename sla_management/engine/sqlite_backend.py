@@ -0,0 +1,271 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+"""
+SQLite stand-in backend for the SLA engine.
+
+Lets the engine be exercised, fuzzed and benchmarked without a Frappe site:
+
+	python -m sla_management.engine.sqlite_backend --records 1000000
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+from contextlib import nullcontext
+from dataclasses import asdict
+from datetime import datetime, timedelta
+
+from sla_management.engine import core
+
+SCHEMA = """
+create table if not exists sla_rule (
+	name text primary key, vertical text, applies_to text, stage_value text,
+	max_hours_allowed real, warning_thresholds text, message text, active integer default 1
+);
+create table if not exists lead (
+	name text primary key, owner text, status text, vertical text, creation text, modified text
+);
+create table if not exists opportunity (
+	name text primary key, owner text, status text, vertical text, creation text, modified text,
+	opportunity_from text, party_name text
+);
+create table if not exists hierarchy (email text, department text, reporting_manager_email text);
+create table if not exists breach_log (
+	record_id text, doctype_name text, stage text, vertical text, reporting_manager_email text,
+	breached_by text, hours_exceeded real, last_stage_change_on text, breached_on text, message text
+);
+create table if not exists record_state (
+	doctype_name text, record_id text, vertical text, stage text, sla_rule text, sla_status text,
+	threshold real, hours_spent real, max_hours_allowed real, last_stage_change_on text,
+	evaluated_on text, primary key (doctype_name, record_id)
+);
+create table if not exists notification (for_user text, document_type text, document_name text, stage text);
+create index if not exists lead_vertical_status on lead (vertical, status);
+create index if not exists opportunity_vertical_status on opportunity (vertical, status);
+create index if not exists opportunity_party on opportunity (opportunity_from, party_name);
+create index if not exists breach_log_record on breach_log (record_id);
+"""
+
+TABLES = {"Lead": "lead", "Opportunity": "opportunity"}
+VERTICALS = ["Permanent Staffing", "Temporary Staffing", "Franchise", "HR Consulting"]
+LEAD_STATUSES = ["New", "Working", "Nurturing", "Converted", "Do Not Contact"]
+OPPORTUNITY_STATUSES = ["Open", "Quotation", "Replied", "Closed"]
+
+# SQLite's default limit on bound parameters is 999 on older builds
+CHUNK_SIZE = 900
+
+
+def _chunked(values, size=CHUNK_SIZE):
+	values = list(values)
+	for i in range(0, len(values), size):
+		yield values[i : i + size]
+
+
+def _placeholders(values):
+	return ", ".join("?" * len(values))
+
+
+class SQLiteBackend:
+	"""SLA engine backend over a SQLite database (":memory:" by default)"""
+
+	def __init__(self, path=":memory:"):
+		self.conn = sqlite3.connect(path)
+		self.conn.row_factory = sqlite3.Row
+		self.conn.executescript(SCHEMA)
+
+	def read_phase(self):
+		return nullcontext()
+
+	# Loading
+
+	def insert(self, table, rows):
+		rows = list(rows)
+		if not rows:
+			return
+		columns = list(rows[0])
+		self.conn.executemany(
+			f"insert into {table} ({', '.join(columns)}) values ({_placeholders(columns)})",
+			[tuple(_to_db(row[c]) for c in columns) for row in rows],
+		)
+		self.conn.commit()
+
+	# Read side
+
+	def get_active_rules(self):
+		return [dict(r) for r in self.conn.execute("select * from sla_rule where active = 1")]
+
+	def get_records(self, doctype, vertical, statuses, start_field):
+		if start_field not in ("creation", "modified"):
+			raise ValueError(start_field)
+		cursor = self.conn.execute(
+			f"""select name, owner, status, vertical, {start_field} as sla_start from {TABLES[doctype]}
+			where vertical = ? and status in ({_placeholders(statuses)})""",
+			(vertical, *statuses),
+		)
+		return (dict(r) for r in cursor)
+
+	def get_lead_opportunities(self, lead_names):
+		opportunities = {}
+		for names in _chunked(lead_names):
+			for row in self.conn.execute(
+				f"""select party_name, min(creation) from opportunity
+				where opportunity_from = 'Lead' and party_name in ({_placeholders(names)})
+				group by party_name""",
+				names,
+			):
+				opportunities[row[0]] = row[1]
+		return opportunities
+
+	def get_hierarchy(self, emails):
+		rows = []
+		for chunk in _chunked({e.strip() for e in emails if e}):
+			rows.extend(
+				dict(r)
+				for r in self.conn.execute(
+					f"select * from hierarchy where email in ({_placeholders(chunk)})", chunk
+				)
+			)
+		return rows
+
+	# Write side
+
+	def get_existing_breach_keys(self, record_ids):
+		keys = []
+		for chunk in _chunked(record_ids):
+			keys.extend(
+				tuple(r)
+				for r in self.conn.execute(
+					f"""select record_id, stage, vertical, reporting_manager_email from breach_log
+					where record_id in ({_placeholders(chunk)})""",
+					chunk,
+				)
+			)
+		return keys
+
+	def upsert_states(self, states, now):
+		now = _to_db(now)
+		self.conn.executemany(
+			"""insert or replace into record_state values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+			[tuple(_to_db(v) for v in asdict(s).values()) + (now,) for s in states],
+		)
+		self.conn.execute("delete from record_state where evaluated_on < ?", (now,))
+		self.conn.commit()
+
+	def insert_breach_logs(self, breach, entries, now):
+		self.conn.executemany(
+			"insert into breach_log values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+			[
+				(
+					breach.record_id,
+					breach.doctype,
+					breach.log_stage,
+					vertical,
+					mgr_email,
+					breach.owner,
+					breach.hrs_exceeded / 24.0,
+					_to_db(breach.sla_start),
+					_to_db(now),
+					breach.message,
+				)
+				for vertical, mgr_email in entries
+			],
+		)
+		self.conn.commit()
+
+	def notify(self, breach):
+		self.conn.execute(
+			"insert into notification values (?, ?, ?, ?)",
+			(breach.owner, breach.doctype, breach.record_id, breach.notify_stage),
+		)
+
+	def finish(self):
+		self.conn.commit()
+
+
+def _to_db(value):
+	if isinstance(value, datetime):
+		return value.isoformat(sep=" ")
+	return value
+
+
+def populate_random(backend, records, now, seed=0):
+	"""Fill `backend` with a random but reproducible data set of `records` Leads and Opportunities"""
+	rng = random.Random(seed)
+	owners = [f"user{i}@example.com" for i in range(200)]
+
+	backend.insert(
+		"sla_rule",
+		[
+			{"name": f"{v}-{s}", "vertical": v, "applies_to": "Lead", "stage_value": s,
+				"max_hours_allowed": rng.choice([24, 48, 72]), "warning_thresholds": "75, 90", "message": s}
+			for v in VERTICALS
+			for s in ("New", "Working, Nurturing", "Converted")
+		]
+		+ [
+			{"name": f"{v}-{s}", "vertical": v, "applies_to": "Opportunity", "stage_value": s,
+				"max_hours_allowed": 96, "warning_thresholds": "80", "message": s}
+			for v in VERTICALS
+			for s in ("Quotation", "Replied")
+		],
+	)
+	backend.insert(
+		"hierarchy",
+		[
+			{"email": o, "department": v, "reporting_manager_email": f"mgr{i % 20}@example.com"}
+			for i, o in enumerate(owners)
+			for v in VERTICALS
+		],
+	)
+
+	def stamp():
+		return now - timedelta(hours=rng.uniform(0, 240))
+
+	leads, opportunities = [], []
+	for i in range(records):
+		creation = stamp()
+		row = {"name": f"LEAD-{i}", "owner": rng.choice(owners), "vertical": rng.choice(VERTICALS),
+			"creation": creation, "modified": creation + timedelta(hours=rng.uniform(0, 24))}
+		if i % 2:
+			row["status"] = rng.choice(LEAD_STATUSES)
+			leads.append(row)
+			if row["status"] == "Converted" and rng.random() < 0.5:
+				opportunities.append({"name": f"OPP-L{i}", "owner": row["owner"], "status": "Open",
+					"vertical": row["vertical"], "creation": row["modified"] + timedelta(hours=rng.uniform(0, 96)),
+					"modified": now, "opportunity_from": "Lead", "party_name": row["name"]})
+		else:
+			row.update(status=rng.choice(OPPORTUNITY_STATUSES), opportunity_from="", party_name="")
+			opportunities.append(row)
+
+		if len(leads) + len(opportunities) >= 50_000:
+			backend.insert("lead", leads)
+			backend.insert("opportunity", opportunities)
+			leads, opportunities = [], []
+
+	backend.insert("lead", leads)
+	backend.insert("opportunity", opportunities)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark the SLA engine on a SQLite data set")
+	parser.add_argument("--records", type=int, default=100_000)
+	parser.add_argument("--db", default=":memory:")
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	now = datetime.now().replace(microsecond=0)
+	backend = SQLiteBackend(args.db)
+
+	start = time.perf_counter()
+	populate_random(backend, args.records, now, seed=args.seed)
+	print(f"Loaded {args.records} records in {time.perf_counter() - start:.2f}s")
+
+	for label in ("first run", "second run (all deduplicated)"):
+		start = time.perf_counter()
+		total = core.run(backend, now)
+		print(f"{label}: {total} records breached in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+	main()
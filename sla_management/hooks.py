@@ -5,6 +5,10 @@ app_description = "SLA Tracker & Escalation System for ERPNext (Lead + Opportuni
 app_email = "crm-head@promptpersonnel.com"
 app_license = "mit"
 
+# Installation
+after_install = "sla_management.utils.indexes.ensure_sla_indexes"
+after_migrate = "sla_management.utils.indexes.ensure_sla_indexes"
+
 # Document Events
 doc_events = {
 	"Lead": {
@@ -18,11 +22,16 @@ doc_events = {
 # Scheduled Tasks
 scheduler_events = {
 	"hourly": [
-		"sla_management.scripts.sla_checker.sla_checker"
+		"sla_management.scripts.sla_checker.scheduled_sla_checker",
+		# Sends each manager's digest at their local morning
+		"sla_management.scripts.sla_daily_summary.scheduled_dispatch_daily_summaries"
 	],
-	"daily": [
-		"sla_management.scripts.sla_daily_summary.sla_daily_summary"
-	]
+	"cron": {
+		# Nightly, off-peak
+		"30 1 * * *": [
+			"sla_management.scripts.sla_snapshot.export_sla_snapshot"
+		]
+	}
 }
 
 # Include JS files for doctype views
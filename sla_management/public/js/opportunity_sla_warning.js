@@ -3,26 +3,30 @@
 
 frappe.ui.form.on("Opportunity", {
 	refresh(frm) {
-		if (frm.doc.last_stage_change_on && frm.doc.stage) {
-			const hours = frappe.datetime.get_hour_diff(
-				frappe.datetime.now_datetime(),
-				frm.doc.last_stage_change_on
-			);
-			
-			// Show warning if in stage for more than 48 hours
-			if (hours > 48) {
-				frm.dashboard.set_headline_alert(
-					`⚠️ SLA Alert: This Opportunity is in stage "${frm.doc.stage}" for ${hours.toFixed(1)} hours.`,
-					"red"
-				);
-			} else if (hours > 40) {
-				// Show warning if approaching 48 hours
-				frm.dashboard.set_headline_alert(
-					`⚠️ SLA Warning: This Opportunity is in stage "${frm.doc.stage}" for ${hours.toFixed(1)} hours.`,
-					"orange"
-				);
-			}
-		}
+		if (frm.is_new()) return;
+
+		// State is computed by the hourly SLA checker (SLA Record State)
+		frappe.call({
+			method: "sla_management.sla_management.doctype.sla_record_state.sla_record_state.get_record_state",
+			args: { doctype_name: frm.doctype, record_id: frm.doc.name },
+			callback(r) {
+				const state = r.message;
+				// Stale if the record has moved stage since the last check
+				if (!state || state.stage !== frm.doc.status) return;
+
+				if (state.sla_status === "Breached") {
+					frm.dashboard.set_headline_alert(
+						`⚠️ SLA Alert: This Opportunity is in stage "${state.stage}" for ${state.hours_spent.toFixed(1)} hours (allowed ${state.max_hours_allowed}). ${frappe.utils.escape_html(state.message || "")}`,
+						"red"
+					);
+				} else if (state.sla_status === "At Risk") {
+					frm.dashboard.set_headline_alert(
+						`⚠️ SLA Warning: This Opportunity is in stage "${state.stage}" for ${state.hours_spent.toFixed(1)} hours (${state.threshold}% of ${state.max_hours_allowed} allowed). ${frappe.utils.escape_html(state.message || "")}`,
+						"orange"
+					);
+				}
+			},
+		});
 	}
 });
 
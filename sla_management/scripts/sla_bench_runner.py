@@ -0,0 +1,90 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+"""
+Bench-level SLA runner.
+
+Runs the SLA jobs for many sites inside one long-lived process instead of one
+scheduler job per site. Imports are paid once, the number of sites hitting the
+database server at the same time is capped, and site starts are staggered.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+
+JOBS = {
+	"checker": "sla_management.scripts.sla_checker.sla_checker",
+	"summary": "sla_management.scripts.sla_daily_summary.dispatch_daily_summaries",
+}
+
+
+def is_bench_runner_enabled():
+	"""Per-site scheduler jobs step aside when `sla_bench_runner` is set in common_site_config"""
+	return bool(frappe.conf.get("sla_bench_runner"))
+
+
+class _Stagger:
+	"""Enforces a minimum gap between site starts across worker threads"""
+
+	def __init__(self, seconds):
+		self.seconds = seconds
+		self.next_start = time.monotonic()
+		self.lock = threading.Lock()
+
+	def wait(self):
+		with self.lock:
+			now = time.monotonic()
+			start_at = max(now, self.next_start)
+			self.next_start = start_at + self.seconds
+		time.sleep(max(0, start_at - now))
+
+
+def _run_site(site, job, sites_path, stagger):
+	stagger.wait()
+	timing = frappe._dict(site=site, seconds=0.0, result=None, error=None, skipped=False)
+	start = time.monotonic()
+
+	try:
+		# Inside the try: a broken site is recorded in its timing, not raised to the pool
+		frappe.init(site=site, sites_path=sites_path)
+		frappe.connect()
+		if "sla_management" not in frappe.get_installed_apps():
+			timing.skipped = True
+			return timing
+
+		timing.result = frappe.get_attr(job)()
+		frappe.db.commit()
+	except Exception as e:
+		if getattr(frappe.local, "db", None):
+			frappe.db.rollback()
+		timing.error = str(e)
+		try:
+			frappe.log_error(title=f"SLA bench runner failed for {site}")
+			# destroy() closes the connection without committing
+			frappe.db.commit()
+		except Exception:
+			pass
+	finally:
+		timing.seconds = time.monotonic() - start
+		frappe.destroy()
+
+	return timing
+
+
+def run_for_sites(sites, job="checker", max_concurrent=2, stagger_seconds=5, sites_path="."):
+	"""
+	Run an SLA job for every site and return per-site timings.
+
+	Each site runs in its own thread-local Frappe context; at most `max_concurrent`
+	sites are connected at once and consecutive site starts are at least
+	`stagger_seconds` apart.
+	"""
+	job = JOBS.get(job, job)
+	stagger = _Stagger(stagger_seconds)
+
+	with ThreadPoolExecutor(max_workers=max(1, max_concurrent), thread_name_prefix="sla") as pool:
+		futures = [pool.submit(_run_site, site, job, sites_path, stagger) for site in sites]
+		return [f.result() for f in futures]
@@ -1,165 +1,93 @@
-
 # Copyright (c) 2024
 # SLA Management App - Final Logic with Correct Field Names
 
-import frappe
-from frappe.utils import now_datetime, get_datetime, time_diff_in_hours
-
-def get_hierarchy_records(employee_email, vertical):
-    """ CRM Reporting Hierarchy se manager nikaalta hai """
-    if not employee_email: return []
-    return frappe.get_all(
-        "CRM Reporting Hierarchy",
-        filters={
-            "email": employee_email.strip(),
-            "department": vertical.strip()
-        },
-        fields=["reporting_manager_email", "department"]
-    )
-
-def send_sla_notification(user, doctype, docname, stage, hours_spent, hours_exceeded):
-    """ Notification Log entry """
-    days_exceeded = hours_exceeded / 24.0
-    try:
-        noti = frappe.new_doc("Notification Log")
-        noti.for_user = user
-        noti.type = "Alert"
-        noti.document_type = doctype
-        noti.document_name = docname
-        noti.subject = f"SLA Breach: {docname}"
-        noti.email_content = f"Record '{docname}' stuck in '{stage}' for {hours_spent:.1f} hrs."
-        noti.insert(ignore_permissions=True)
-    except Exception as e:
-        frappe.logger().error(f"SLA Notification failed: {e}")
-
-def create_breach_log(rule, doc, log_stage, current_time, sla_start, hours_exceeded):
-    """ SLA Breach Log create karta hai with Correct Field Names from First Code """
-    hierarchy_list = get_hierarchy_records(doc.owner, doc.custom_vertical)
+from contextlib import contextmanager
 
-    if not hierarchy_list:
-        hierarchy_list = [{"reporting_manager_email": "", "department": doc.custom_vertical}]
+import frappe
+from frappe.utils import now_datetime
+from redis.exceptions import LockError
 
-    created = False
-    for entry in hierarchy_list:
-        mgr_email = entry.get("reporting_manager_email") or ""
-        dept = entry.get("department") or doc.custom_vertical
+from sla_management.engine import core
+from sla_management.engine.frappe_backend import FrappeBackend, chunked
 
-        # Duplicate Check (Fields from First Code)
-        if frappe.db.exists("SLA Breach Log", {
-            "record_id": doc.name,
-            "stage": log_stage,
-            "vertical": dept,
-            "reporting_manager_email": mgr_email
-        }):
-            continue
+REEVALUATE_CHUNK_SIZE = 500
+# Lock expiry = long queue timeout - RQ ne job kill kiya toh lock isse zyada nahi atakta
+CHECKER_LOCK_TIMEOUT = 25 * 60
+# Wait default queue ke 300s job timeout se kaafi kam
+CHECKER_LOCK_WAIT = 60
 
-        log = frappe.get_doc({
-            "doctype": "SLA Breach Log",
-            "vertical": dept,
-            "doctype_name": doc.doctype,
-            "record_id": doc.name,
-            "breached_by": doc.owner,
-            "stage": log_stage,
-            "hours_exceeded": hours_exceeded / 24.0, # Days logic
-            "last_stage_change_on": sla_start,
-            "breached_on": current_time,
-            "reporting_manager_email": mgr_email,
-            "message": rule.message # Message from Rule
-        })
-        log.insert(ignore_permissions=True)
-        created = True
-    
-    if created: frappe.db.commit()
-    return created
+@contextmanager
+def checker_lock():
+    """
+    Hourly checker aur rule re-evaluation chunks ek ke baad ek chalte hain -
+    breach log dedup read aur insert ke beech koi doosra run nahi aana chahiye.
+    Yields False jab CHECKER_LOCK_WAIT seconds mein lock nahi mila.
+    """
+    lock = frappe.cache.lock(
+        frappe.cache.make_key("sla_checker"),
+        timeout=CHECKER_LOCK_TIMEOUT,
+        blocking_timeout=CHECKER_LOCK_WAIT
+    )
+    acquired = lock.acquire()
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except LockError:
+                # Timeout ke baad expire ho gaya
+                pass
 
 def sla_checker():
     print("SLA Checker Execution Started...")
     frappe.logger().info("Starting SLA Checker...")
-    
-    rules = frappe.get_all("SLA Rule", filters={"active": 1}, fields=["*"])
-    now_time = now_datetime()
-    total_logs = 0
 
-    for rule in rules:
-        max_hrs = rule.max_hours_allowed
-        r_stage = rule.stage_value or "" # Handle NoneType
-        
-        # LEAD SECTION
-        if rule.applies_to == "Lead":
-            
-            # --- RULE 1: SEPARATE - ONLY FOR "NEW" STATUS ---
-            if r_stage == "New":
-                leads = frappe.get_all("Lead", 
-                    filters={"custom_vertical": rule.vertical, "status": "New"}, 
-                    fields=["name", "owner", "creation", "status", "custom_vertical"])
-                
-                for lead in leads:
-                    sla_start = get_datetime(lead.creation)
-                    hrs_spent = time_diff_in_hours(now_time, sla_start)
-                    if hrs_spent > max_hrs:
-                        if create_breach_log(rule, lead, "New", now_time, sla_start, hrs_spent - max_hrs):
-                            send_sla_notification(lead.owner, "Lead", lead.name, "New", hrs_spent, hrs_spent - max_hrs)
-                            total_logs += 1
+    # Bulk reads replica par (agar configured), dedup + inserts primary par - see engine.core.run
+    with checker_lock() as acquired:
+        if not acquired:
+            # Re-evaluation chunks chal rahe hain - agla hourly run in records ko dekh lega
+            frappe.logger().warning("SLA Checker skipped: another SLA run holds the lock")
+            return 0
+        total_logs = core.run(FrappeBackend(), now_datetime())
 
-            # --- RULE 2: LEAD CONVERTED BUT NO OPPORTUNITY CREATED ---
-            elif r_stage == "Converted":
-                leads = frappe.get_all("Lead", 
-                    filters={"custom_vertical": rule.vertical, "status": "Converted"}, 
-                    fields=["name", "owner", "modified", "status", "custom_vertical"])
-                
-                for lead in leads:
-                    # Correct Linking Logic from First Code
-                    opp = frappe.db.get_value(
-                        "Opportunity",
-                        {"opportunity_from": "Lead", "party_name": lead.name},
-                        ["name", "creation"],
-                        as_dict=True
-                    )
-                    
-                    sla_start = get_datetime(lead.modified) # Time of conversion
-                    calc_end = get_datetime(opp.creation) if opp else now_time
-                    hrs_spent = time_diff_in_hours(calc_end, sla_start)
-                    
-                    if hrs_spent > max_hrs:
-                        if create_breach_log(rule, lead, "Converted", now_time, sla_start, hrs_spent - max_hrs):
-                            send_sla_notification(lead.owner, "Lead", lead.name, "Converted (Missing Opp)", hrs_spent, hrs_spent - max_hrs)
-                            total_logs += 1
+    frappe.logger().info(f"SLA Checker Completed. Total Logs: {total_logs}")
+    return total_logs
 
-            # --- RULE 3 & 4: MULTIPLE STATUS (Working, Nurturing) ---
-            elif "Working" in r_stage or "Nurturing" in r_stage:
-                allowed_statuses = [s.strip() for s in r_stage.split(',') if s.strip()]
-                
-                leads = frappe.get_all("Lead", 
-                    filters={
-                        "custom_vertical": rule.vertical, 
-                        "status": ["in", allowed_statuses]
-                    }, 
-                    fields=["name", "owner", "creation", "status", "custom_vertical"])
-                
-                for lead in leads:
-                    sla_start = get_datetime(lead.creation) # Creation se check
-                    hrs_spent = time_diff_in_hours(now_time, sla_start)
-                    if hrs_spent > max_hrs:
-                        if create_breach_log(rule, lead, lead.status, now_time, sla_start, hrs_spent - max_hrs):
-                            send_sla_notification(lead.owner, "Lead", lead.name, lead.status, hrs_spent, hrs_spent - max_hrs)
-                            total_logs += 1
+def reevaluate_rule(rule_name):
+    """ SLA Rule change ke baad - affected records ko chunked background jobs mein re-evaluate karo """
+    rule = frappe.db.get_value("SLA Rule", rule_name, "*", as_dict=True)
+    if not rule or not rule.active: return
 
-        # OPPORTUNITY SECTION
-        elif rule.applies_to == "Opportunity":
-            # Agreement ya jo bhi stage rule mein define ho
-            opps = frappe.get_all("Opportunity", 
-                filters={"custom_vertical": rule.vertical, "status": r_stage}, 
-                fields=["name", "owner", "modified", "status", "custom_vertical"])
-            
-            for opp in opps:
-                # Opportunity mein hamesha 'modified' se check hota hai (Stage Change Point)
-                sla_start = get_datetime(opp.modified)
-                hrs_spent = time_diff_in_hours(now_time, sla_start)
-                
-                if hrs_spent > max_hrs:
-                    if create_breach_log(rule, opp, r_stage, now_time, sla_start, hrs_spent - max_hrs):
-                        send_sla_notification(opp.owner, "Opportunity", opp.name, r_stage, hrs_spent, hrs_spent - max_hrs)
-                        total_logs += 1
+    backend = FrappeBackend()
+    with backend.read_phase():
+        names = backend.get_record_names(rule)
 
-    frappe.logger().info(f"SLA Checker Completed. Total Logs: {total_logs}")
-    return total_logs
\ No newline at end of file
+    for chunk in chunked(names, REEVALUATE_CHUNK_SIZE):
+        frappe.enqueue(
+            "sla_management.scripts.sla_checker.evaluate_record_chunk",
+            queue="long",
+            doctype=rule.applies_to,
+            record_names=chunk
+        )
+    frappe.logger().info(f"SLA Rule {rule_name}: {len(names)} records queued for re-evaluation")
+
+def evaluate_record_chunk(doctype, record_names):
+    """ Sirf in records ke liye full SLA check (saare active rules) """
+    with checker_lock() as acquired:
+        if not acquired:
+            # Checker chal raha hai - chunk ko queue ke end mein wapas bhejo, job timeout tak wait nahi
+            frappe.enqueue(
+                "sla_management.scripts.sla_checker.evaluate_record_chunk",
+                queue="long",
+                doctype=doctype,
+                record_names=record_names
+            )
+            return 0
+        return core.run(FrappeBackend(doctype=doctype, record_names=record_names), now_datetime())
+
+def scheduled_sla_checker():
+    """ Hourly scheduler entry - skipped when the bench-level runner handles all sites """
+    from sla_management.scripts.sla_bench_runner import is_bench_runner_enabled
+    if is_bench_runner_enabled(): return 0
+    return sla_checker()
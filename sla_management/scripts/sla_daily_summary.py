@@ -4,14 +4,120 @@
 # Copyright (c) 2024
 # SLA Management App
 
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
 import frappe
-from frappe.utils import now_datetime, add_days, get_datetime, validate_email_address
+from frappe.utils import now_datetime, add_days, cint, get_datetime, getdate, get_system_timezone, validate_email_address
 from frappe import _
 
+from sla_management.utils.replica import replica_reads
+
+SUMMARY_FIELDS = [
+    "name",
+    "vertical",
+    "doctype_name",
+    "record_id",
+    "breached_by",
+    "stage",
+    "hours_exceeded",
+    "breached_on",
+    "reporting_manager_email",
+    "message"
+]
+
+# Recipient ke local time ka hour jab digest jaata hai
+DEFAULT_SUMMARY_HOUR = 7
+
+
+def normalize_manager_email(mgr_email):
+    """ Lowercase + strip; missing ya invalid email pe None """
+    if not mgr_email:
+        return None
+    email = mgr_email.strip().lower()
+    if not validate_email_address(email):
+        return None
+    return email
+
+
+def send_summary_email(manager_email, manager_breaches, base_url):
+    """ Ek manager ke breaches ka consolidated email """
+    subject = _("Daily SLA Breach Summary: {0} Records").format(len(manager_breaches))
+    rows = []
+
+    for b in manager_breaches:
+        delay_days = b.get("hours_exceeded") or 0
+
+        doctype_name = b.get("doctype_name") or "Lead"
+        dt_slug = doctype_name.lower().replace(" ", "-")
+
+        record_id = b.get("record_id") or "Unknown"
+        record_url = f"{base_url}/app/{dt_slug}/{record_id}"
+
+        rows.append(f"""
+        <tr>
+            <td style="border:1px solid #ddd;padding:6px;">
+                <a href="{record_url}">{record_id}</a>
+            </td>
+            <td style="border:1px solid #ddd;padding:6px;">
+                {b.get("vertical") or "-"}
+            </td>
+            <td style="border:1px solid #ddd;padding:6px;">
+                {b.get("stage") or "-"}
+            </td>
+            <td style="border:1px solid #ddd;padding:6px;color:red;">
+                {delay_days:.3f} Days
+            </td>
+            <td style="border:1px solid #ddd;padding:6px;">
+                {b.get("breached_by") or "-"}
+            </td>
+            <td style="border:1px solid #ddd;padding:6px;">
+                {b.get("message") or "-"}
+            </td>
+            <td style="border:1px solid #ddd;padding:6px;">
+                {get_datetime(b.get("breached_on")).strftime('%Y-%m-%d %I:%M %p')}
+            </td>
+        </tr>
+        """)
+
+    email_html = f"""
+    <div style="font-family:Arial,sans-serif;">
+        <p>Hello,</p>
+        <p>Please find below the SLA breach summary for the last 24 hours:</p>
+
+        <table style="border-collapse:collapse;width:100%;font-size:11px;">
+            <thead>
+                <tr style="background:#f2f2f2;">
+                    <th style="border:1px solid #ddd;padding:6px;">Record</th>
+                    <th style="border:1px solid #ddd;padding:6px;">Vertical</th>
+                    <th style="border:1px solid #ddd;padding:6px;">Stage</th>
+                    <th style="border:1px solid #ddd;padding:6px;">Delay</th>
+                    <th style="border:1px solid #ddd;padding:6px;">Owner</th>
+                    <th style="border:1px solid #ddd;padding:6px;">Message</th>
+                    <th style="border:1px solid #ddd;padding:6px;">Time</th>
+                </tr>
+            </thead>
+            <tbody>
+                {''.join(rows)}
+            </tbody>
+        </table>
+
+        <p>Please take necessary action.</p>
+        <hr>
+        <small>Automated SLA Management System</small>
+    </div>
+    """
+
+    frappe.sendmail(
+        recipients=[manager_email],
+        subject=subject,
+        message=email_html,
+        delayed=False
+    )
+
 
 def sla_daily_summary():
     """
-    Daily Scheduled Job
+    All managers in one run (manual trigger) - scheduled delivery is dispatch_daily_summaries
     - Collects all SLA Breach Log records (ALL verticals)
     - Groups them by reporting_manager_email
     - Sends ONE consolidated email per manager
@@ -23,26 +129,16 @@ def sla_daily_summary():
     # Last 24 hours
     from_date = add_days(now_datetime(), -1)
 
-    # 1️ Fetch ALL SLA Breaches (no vertical filter)
-    breaches = frappe.get_all(
-        "SLA Breach Log",
-        filters={
-            "breached_on": [">=", from_date]
-        },
-        fields=[
-            "name",
-            "vertical",
-            "doctype_name",
-            "record_id",
-            "breached_by",
-            "stage",
-            "hours_exceeded",
-            "breached_on",
-            "reporting_manager_email",
-            "message"
-        ],
-        order_by="reporting_manager_email asc"
-    )
+    # 1️ Fetch ALL SLA Breaches (no vertical filter) - read replica if configured
+    with replica_reads():
+        breaches = frappe.get_all(
+            "SLA Breach Log",
+            filters={
+                "breached_on": [">=", from_date]
+            },
+            fields=SUMMARY_FIELDS,
+            order_by="reporting_manager_email asc"
+        )
 
     if not breaches:
         print("No SLA breaches found.")
@@ -55,17 +151,10 @@ def sla_daily_summary():
     skipped = 0
 
     for breach in breaches:
-        mgr_email = breach.get("reporting_manager_email")
+        email = normalize_manager_email(breach.get("reporting_manager_email"))
 
-        # Skip missing email
-        if not mgr_email:
-            skipped += 1
-            continue
-
-        email = mgr_email.strip().lower()
-
-        # Skip invalid email
-        if not validate_email_address(email):
+        # Skip missing/invalid email
+        if not email:
             skipped += 1
             continue
 
@@ -85,78 +174,7 @@ def sla_daily_summary():
         try:
             print(f"Preparing email for: {manager_email} ({len(manager_breaches)} records)")
 
-            subject = _("Daily SLA Breach Summary: {0} Records").format(len(manager_breaches))
-            rows = []
-
-            for b in manager_breaches:
-                delay_days = b.get("hours_exceeded") or 0
-
-                doctype_name = b.get("doctype_name") or "Lead"
-                dt_slug = doctype_name.lower().replace(" ", "-")
-
-                record_id = b.get("record_id") or "Unknown"
-                record_url = f"{base_url}/app/{dt_slug}/{record_id}"
-
-                rows.append(f"""
-                <tr>
-                    <td style="border:1px solid #ddd;padding:6px;">
-                        <a href="{record_url}">{record_id}</a>
-                    </td>
-                    <td style="border:1px solid #ddd;padding:6px;">
-                        {b.get("vertical") or "-"}
-                    </td>
-                    <td style="border:1px solid #ddd;padding:6px;">
-                        {b.get("stage") or "-"}
-                    </td>
-                    <td style="border:1px solid #ddd;padding:6px;color:red;">
-                        {delay_days:.3f} Days
-                    </td>
-                    <td style="border:1px solid #ddd;padding:6px;">
-                        {b.get("breached_by") or "-"}
-                    </td>
-                    <td style="border:1px solid #ddd;padding:6px;">
-                        {b.get("message") or "-"}
-                    </td>
-                    <td style="border:1px solid #ddd;padding:6px;">
-                        {get_datetime(b.get("breached_on")).strftime('%Y-%m-%d %I:%M %p')}
-                    </td>
-                </tr>
-                """)
-
-            email_html = f"""
-            <div style="font-family:Arial,sans-serif;">
-                <p>Hello,</p>
-                <p>Please find below the SLA breach summary for the last 24 hours:</p>
-
-                <table style="border-collapse:collapse;width:100%;font-size:11px;">
-                    <thead>
-                        <tr style="background:#f2f2f2;">
-                            <th style="border:1px solid #ddd;padding:6px;">Record</th>
-                            <th style="border:1px solid #ddd;padding:6px;">Vertical</th>
-                            <th style="border:1px solid #ddd;padding:6px;">Stage</th>
-                            <th style="border:1px solid #ddd;padding:6px;">Delay</th>
-                            <th style="border:1px solid #ddd;padding:6px;">Owner</th>
-                            <th style="border:1px solid #ddd;padding:6px;">Message</th>
-                            <th style="border:1px solid #ddd;padding:6px;">Time</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {''.join(rows)}
-                    </tbody>
-                </table>
-
-                <p>Please take necessary action.</p>
-                <hr>
-                <small>Automated SLA Management System</small>
-            </div>
-            """
-
-            frappe.sendmail(
-                recipients=[manager_email],
-                subject=subject,
-                message=email_html,
-                delayed=False
-            )
+            send_summary_email(manager_email, manager_breaches, base_url)
 
             sent_count += 1
             print(f"Email queued for {manager_email}")
@@ -167,3 +185,162 @@ def sla_daily_summary():
     frappe.db.commit()
     print(f"Summary sent to {sent_count} managers.")
     return len(breaches)
+
+
+def get_local_time(now, time_zone, system_tz):
+    """ System time (naive) ko recipient ke time zone mein convert karo """
+    try:
+        tz = ZoneInfo(time_zone) if time_zone else system_tz
+    except (ZoneInfoNotFoundError, ValueError):
+        tz = system_tz
+    return now.replace(tzinfo=system_tz).astimezone(tz)
+
+
+def get_manager_time_zones(emails):
+    """ {email: User.time_zone} - jin managers ka User nahi hai woh system time zone lenge """
+    time_zones = {}
+    emails = list(emails)
+    for i in range(0, len(emails), 500):
+        for user in frappe.get_all(
+            "User",
+            filters={"name": ["in", emails[i:i + 500]]},
+            fields=["name", "time_zone"]
+        ):
+            time_zones[user.name.lower()] = user.time_zone
+    return time_zones
+
+
+def get_manager_breaches(manager_emails, from_date, to_date):
+    """ Sirf ek manager ka window [from_date, to_date) - (reporting_manager_email, breached_on) index pe """
+    with replica_reads():
+        return frappe.get_all(
+            "SLA Breach Log",
+            filters=[
+                ["reporting_manager_email", "in", manager_emails],
+                ["breached_on", ">=", from_date],
+                ["breached_on", "<", to_date]
+            ],
+            fields=SUMMARY_FIELDS,
+            order_by="breached_on asc"
+        )
+
+
+def get_last_sent_dates(emails):
+    """
+    {email: last digest date (manager ke time zone mein)} - DB se, cache se nahi:
+    clear-cache / migrate ke baad bhi same din dobara digest nahi jaana chahiye
+    """
+    sent = {}
+    emails = list(emails)
+    for i in range(0, len(emails), 500):
+        for row in frappe.get_all(
+            "SLA Summary Delivery",
+            filters={"name": ["in", emails[i:i + 500]]},
+            fields=["name", "last_sent_date"]
+        ):
+            sent[row.name] = getdate(row.last_sent_date) if row.last_sent_date else None
+    return sent
+
+
+def mark_summary_sent(manager_email, local_date, breaches):
+    values = {"last_sent_date": local_date, "last_sent_on": now_datetime(), "breaches": breaches}
+    if frappe.db.exists("SLA Summary Delivery", manager_email):
+        frappe.db.set_value("SLA Summary Delivery", manager_email, values)
+    else:
+        frappe.get_doc(dict(values, doctype="SLA Summary Delivery", manager_email=manager_email)).insert(
+            ignore_permissions=True
+        )
+
+
+def send_manager_summary(manager_email, manager_emails, from_date, to_date, local_date):
+    """
+    Background job - ek manager ka digest.
+    manager_emails: Breach Log mein jaise stored hain (case/space variants)
+    Last sent date sirf successful send ke baad - fail hua toh agla hourly dispatch retry karega
+    """
+    breaches = get_manager_breaches(manager_emails, from_date, to_date)
+    if breaches:
+        send_summary_email(manager_email, breaches, frappe.utils.get_url())
+
+    # Empty window bhi "done" hai - aaj ke liye dobara check nahi
+    mark_summary_sent(manager_email, local_date, len(breaches))
+    frappe.db.commit()
+    return len(breaches)
+
+
+def dispatch_daily_summaries():
+    """
+    Hourly Scheduled Job
+    - Finds managers with recent breaches
+    - For managers whose local time is at or past the summary hour (sla_summary_hour,
+      default 7 AM) and who have not had today's digest yet, enqueues one
+      send_manager_summary job for the 24 hours up to today's summary hour
+    Digests thus go out at each recipient's local morning, spread across the day
+    instead of one big run. A missed hour or a failed job is caught up by the next run.
+    """
+    now = now_datetime()
+    # set-config "8" string ke roop mein store karta hai
+    summary_hour = cint(frappe.conf.get("sla_summary_hour", DEFAULT_SUMMARY_HOUR))
+
+    # Kisi bhi time zone ka window (24 hrs, aaj ke summary hour tak) isme aa jaata hai
+    with replica_reads():
+        stored_emails = frappe.get_all(
+            "SLA Breach Log",
+            filters={"breached_on": [">=", add_days(now, -2)]},
+            fields=["reporting_manager_email"],
+            distinct=True,
+            pluck="reporting_manager_email"
+        )
+
+    # Normalized email -> Breach Log mein stored variants
+    managers = {}
+    for stored in stored_emails:
+        email = normalize_manager_email(stored)
+        if email:
+            managers.setdefault(email, []).append(stored)
+
+    if not managers:
+        return 0
+
+    system_tz = ZoneInfo(get_system_timezone())
+    time_zones = get_manager_time_zones(managers)
+    last_sent = get_last_sent_dates(managers)
+    enqueued = 0
+
+    for email, stored in managers.items():
+        local_now = get_local_time(now, time_zones.get(email), system_tz)
+        if local_now.hour < summary_hour:
+            continue
+
+        # Aaj ka digest ja chuka hai
+        if last_sent.get(email) == local_now.date():
+            continue
+
+        # Window recipient ke summary hour pe khatam - late dispatch se window shift nahi hota
+        to_date = local_now.replace(hour=summary_hour, minute=0, second=0, microsecond=0)
+        to_date = to_date.astimezone(system_tz).replace(tzinfo=None)
+
+        frappe.enqueue(
+            "sla_management.scripts.sla_daily_summary.send_manager_summary",
+            queue="long",
+            # Pending job hai toh dobara enqueue nahi
+            job_id=f"sla_daily_summary:{email}",
+            deduplicate=True,
+            manager_email=email,
+            manager_emails=stored,
+            from_date=add_days(to_date, -1),
+            to_date=to_date,
+            local_date=str(local_now.date())
+        )
+        enqueued += 1
+
+    frappe.logger().info(f"SLA Daily Summary: enqueued {enqueued} of {len(managers)} managers")
+    return enqueued
+
+
+def scheduled_dispatch_daily_summaries():
+    """ Hourly scheduler entry - skipped when the bench-level runner handles all sites """
+    from sla_management.scripts.sla_bench_runner import is_bench_runner_enabled
+    if is_bench_runner_enabled():
+        return 0
+    return dispatch_daily_summaries()
@@ -0,0 +1,40 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+from sla_management.engine import snapshot
+from sla_management.engine.frappe_backend import FrappeBackend
+
+
+def export_sla_snapshot():
+	"""
+	Nightly job - writes a columnar snapshot of open SLA state to
+	sites/<site>/private/sla_snapshots for offline analytics.
+
+	Site config:
+	- sla_snapshot_format: "arrow" (default, memory-mappable) or "parquet"
+	- sla_snapshot_retention_days: days to keep (default 30)
+	"""
+	try:
+		import pyarrow  # noqa: F401
+	except ImportError:
+		frappe.logger().warning("SLA Snapshot skipped: pyarrow is not installed")
+		return None
+
+	now = now_datetime()
+	backend = FrappeBackend()
+	base_dir = frappe.get_site_path("private", "sla_snapshots")
+
+	with backend.read_phase():
+		partitions = snapshot.build_partitions(backend.get_active_rules(), backend, now)
+
+	path = snapshot.write_snapshot(
+		partitions, base_dir, now, fmt=frappe.conf.get("sla_snapshot_format") or "arrow"
+	)
+	# set-config stores numbers as strings
+	snapshot.prune_snapshots(base_dir, now, cint(frappe.conf.get("sla_snapshot_retention_days")) or 30)
+
+	frappe.logger().info(f"SLA Snapshot written to {path} ({sum(map(len, partitions.values()))} rows)")
+	return path
@@ -0,0 +1,39 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from sla_management.utils.rule_registry import get_rules
+
+
+def get_state_name(doctype_name, record_id):
+	return f"{doctype_name}-{record_id}"
+
+
+class SLARecordState(Document):
+	def autoname(self):
+		self.name = get_state_name(self.doctype_name, self.record_id)
+
+
+@frappe.whitelist()
+def get_record_state(doctype_name, record_id):
+	"""Current SLA state of a Lead/Opportunity, used by the form warnings"""
+	frappe.has_permission(doctype_name, "read", record_id, throw=True)
+
+	state = frappe.db.get_value(
+		"SLA Record State",
+		get_state_name(doctype_name, record_id),
+		["sla_status", "vertical", "stage", "sla_rule", "hours_spent", "max_hours_allowed", "threshold"],
+		as_dict=True,
+	)
+	if not state:
+		return None
+
+	# Rule deactivated or changed since the last check - nothing to warn about
+	rule = next((r for r in get_rules(doctype_name, state.vertical, state.stage) if r.name == state.sla_rule), None)
+	if not rule:
+		return None
+
+	state.message = rule.message
+	return state
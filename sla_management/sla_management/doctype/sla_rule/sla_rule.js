@@ -1,8 +1,39 @@
 // Copyright (c) 2025, SLA Management Team and contributors
 // For license information, please see license.txt
 
-// frappe.ui.form.on("SLA Rule", {
-// 	refresh(frm) {
+frappe.ui.form.on("SLA Rule", {
+	refresh(frm) {
+		frm.add_custom_button(__("Preview Impact"), () => {
+			frm.call("preview_impact").then((r) => {
+				const { proposed, current } = r.message || {};
+				if (!proposed) {
+					frappe.msgprint(__("This rule does not match any records the SLA checker evaluates."));
+					return;
+				}
 
-// 	},
-// });
+				const row = (label, key) => `
+					<tr>
+						<td>${label}</td>
+						<td>${current ? current[key] : "-"}</td>
+						<td><b>${proposed[key]}</b></td>
+					</tr>`;
+
+				frappe.msgprint({
+					title: __("SLA Rule Impact"),
+					indicator: proposed.new_breaches ? "orange" : "green",
+					message: `
+						<table class="table table-bordered">
+							<thead><tr><th></th><th>${__("Saved")}</th><th>${__("With Changes")}</th></tr></thead>
+							<tbody>
+								${row(__("Records in Stage"), "in_stage")}
+								${row(__("Breaching"), "breaching")}
+								${row(__("New Breach Logs"), "new_breaches")}
+								${row(__("At Risk"), "at_risk")}
+							</tbody>
+						</table>
+						<p class="text-muted">${__("On save, affected records are re-evaluated in background jobs.")}</p>`,
+				});
+			});
+		});
+	},
+});
@@ -2,8 +2,59 @@
 # For license information, please see license.txt
 
 import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import now_datetime
+
+from sla_management.engine.core import parse_warning_thresholds
+from sla_management.utils.rule_registry import invalidate_rule_registry
+
+# Changes to these fields alter which records breach, see on_update
+IMPACT_FIELDS = ("vertical", "applies_to", "stage_value", "max_hours_allowed", "warning_thresholds", "active")
 
 
 class SLARule(Document):
-	pass
+	def validate(self):
+		self.validate_warning_thresholds()
+
+	def validate_warning_thresholds(self):
+		try:
+			thresholds = parse_warning_thresholds(self.warning_thresholds)
+		except ValueError:
+			frappe.throw(_("Warning Thresholds must be comma-separated numbers, e.g. 75, 90"))
+
+		for threshold in thresholds:
+			if not 0 < threshold < 100:
+				frappe.throw(_("Warning Threshold {0}% must be between 0 and 100").format(threshold))
+
+		self.warning_thresholds = ", ".join(f"{t:g}" for t in thresholds)
+
+	def on_update(self):
+		invalidate_rule_registry()
+
+		if self.active and any(self.has_value_changed(f) for f in IMPACT_FIELDS):
+			# Re-evaluate affected records in chunks now instead of in the next hourly run
+			frappe.enqueue(
+				"sla_management.scripts.sla_checker.reevaluate_rule",
+				queue="long",
+				rule_name=self.name,
+				enqueue_after_commit=True,
+			)
+
+	def on_trash(self):
+		invalidate_rule_registry()
+
+	@frappe.whitelist()
+	def preview_impact(self):
+		"""Count-only impact of the (unsaved) rule, compared to the saved version"""
+		from sla_management.engine.frappe_backend import FrappeBackend
+
+		backend = FrappeBackend()
+		now = now_datetime()
+		saved = None if self.is_new() else frappe.db.get_value("SLA Rule", self.name, "*", as_dict=True)
+
+		with backend.read_phase():
+			return {
+				"proposed": backend.count_rule_impact(self.as_dict(), now),
+				"current": backend.count_rule_impact(saved, now) if saved and saved.active else None,
+			}
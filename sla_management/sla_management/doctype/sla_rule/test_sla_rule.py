@@ -1,9 +1,94 @@
 # Copyright (c) 2025, SLA Management Team and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from sla_management.sla_management.doctype.sla_rule.sla_rule import parse_warning_thresholds
+
 
 class TestSLARule(FrappeTestCase):
-	pass
+	def test_parse_warning_thresholds(self):
+		self.assertEqual(parse_warning_thresholds("90, 75%, 75"), [75.0, 90.0])
+		self.assertEqual(parse_warning_thresholds(""), [])
+		self.assertEqual(parse_warning_thresholds(None), [])
+
+	def test_invalid_warning_thresholds(self):
+		for value in ("abc", "120", "0"):
+			with self.subTest(value=value):
+				rule = frappe.get_doc({
+					"doctype": "SLA Rule",
+					"vertical": "Permanent Staffing",
+					"applies_to": "Lead",
+					"stage_field": "status",
+					"stage_value": "New",
+					"max_hours_allowed": 24,
+					"warning_thresholds": value,
+				})
+				self.assertRaises(frappe.ValidationError, rule.insert)
+
+	def test_rule_change_queues_reevaluation(self):
+		from unittest.mock import patch
+
+		rule = frappe.get_doc({
+			"doctype": "SLA Rule",
+			"vertical": "Permanent Staffing",
+			"applies_to": "Lead",
+			"stage_field": "status",
+			"stage_value": "New",
+			"max_hours_allowed": 24,
+		})
+		with patch("frappe.enqueue") as enqueue:
+			rule.insert()
+			self.assertEqual(enqueue.call_count, 1)
+
+			rule.message = "Only the message changed"
+			rule.save()
+			self.assertEqual(enqueue.call_count, 1)
+
+			rule.max_hours_allowed = 12
+			rule.save()
+			self.assertEqual(enqueue.call_count, 2)
+			self.assertEqual(enqueue.call_args.kwargs["rule_name"], rule.name)
+
+	def test_preview_impact(self):
+		rule = frappe.get_doc({
+			"doctype": "SLA Rule",
+			"vertical": "Permanent Staffing",
+			"applies_to": "Lead",
+			"stage_field": "status",
+			"stage_value": "New",
+			"max_hours_allowed": 24,
+			"warning_thresholds": "75",
+		})
+		impact = rule.preview_impact()
+		self.assertIsNone(impact["current"])
+		self.assertEqual(
+			set(impact["proposed"]), {"in_stage", "breaching", "new_breaches", "at_risk"}
+		)
+		self.assertLessEqual(impact["proposed"].new_breaches, impact["proposed"].breaching)
+
+	def test_rule_registry_invalidated(self):
+		from sla_management.utils.rule_registry import get_registry, get_rules
+
+		registry = get_registry()
+		self.assertIs(get_registry(), registry)
+
+		rule = frappe.get_doc({
+			"doctype": "SLA Rule",
+			"vertical": "POSH",
+			"applies_to": "Lead",
+			"stage_field": "status",
+			"stage_value": "Working, Nurturing",
+			"max_hours_allowed": 48,
+		}).insert()
+
+		self.assertIsNot(get_registry(), registry)
+		self.assertIn(rule.name, [r.name for r in get_rules("Lead", "POSH", "Nurturing")])
+
+		rule.active = 0
+		rule.save()
+		self.assertNotIn(rule.name, [r.name for r in get_rules("Lead", "POSH", "Nurturing")])
+
+		rule.delete()
+		self.assertNotIn(rule.name, [r.name for r in get_registry().rules])
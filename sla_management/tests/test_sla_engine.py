@@ -0,0 +1,179 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+"""
+Tests for the framework-independent SLA engine, run against the SQLite backend.
+These do not need a Frappe site.
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sla_management.engine import core, snapshot
+from sla_management.engine.sqlite_backend import SQLiteBackend, populate_random
+
+NOW = datetime(2026, 1, 10, 12, 0, 0)
+
+
+def hours_ago(hours):
+	return NOW - timedelta(hours=hours)
+
+
+class TestSLAEngine(unittest.TestCase):
+	def setUp(self):
+		self.backend = SQLiteBackend()
+		self.backend.insert("sla_rule", [
+			{"name": "R-NEW", "vertical": "Permanent Staffing", "applies_to": "Lead", "stage_value": "New",
+				"max_hours_allowed": 24, "warning_thresholds": "75, 90", "message": "Call the lead"},
+			{"name": "R-WORK", "vertical": "Permanent Staffing", "applies_to": "Lead",
+				"stage_value": "Working, Nurturing", "max_hours_allowed": 48, "warning_thresholds": "", "message": ""},
+			{"name": "R-CONV", "vertical": "Permanent Staffing", "applies_to": "Lead", "stage_value": "Converted",
+				"max_hours_allowed": 24, "warning_thresholds": "50", "message": ""},
+			{"name": "R-OPP", "vertical": "Permanent Staffing", "applies_to": "Opportunity",
+				"stage_value": "Quotation", "max_hours_allowed": 72, "warning_thresholds": "", "message": ""},
+		])
+		self.backend.insert("hierarchy", [
+			{"email": "owner@example.com", "department": "Permanent Staffing",
+				"reporting_manager_email": "boss1@example.com"},
+			{"email": "owner@example.com", "department": "Permanent Staffing",
+				"reporting_manager_email": "boss2@example.com"},
+		])
+
+	def add_lead(self, name, status, creation, modified=None, owner="owner@example.com",
+			vertical="Permanent Staffing"):
+		self.backend.insert("lead", [{"name": name, "owner": owner, "status": status, "vertical": vertical,
+			"creation": creation, "modified": modified or creation}])
+
+	def rows(self, sql, *args):
+		return [tuple(r) for r in self.backend.conn.execute(sql, args)]
+
+	def test_classify_sla(self):
+		self.assertEqual(core.classify_sla(10, 24, [75, 90]), (core.ON_TRACK, 0))
+		self.assertEqual(core.classify_sla(18, 24, [75, 90]), (core.AT_RISK, 75))
+		self.assertEqual(core.classify_sla(22, 24, [75, 90]), (core.AT_RISK, 90))
+		self.assertEqual(core.classify_sla(25, 24, [75, 90]), (core.BREACHED, 100))
+
+	def test_index_rules(self):
+		index = core.index_rules(self.backend.get_active_rules())
+		self.assertEqual([r["name"] for r in index[("Lead", "Permanent Staffing", "Nurturing")]], ["R-WORK"])
+		self.assertEqual([r["name"] for r in index[("Opportunity", "Permanent Staffing", "Quotation")]], ["R-OPP"])
+		self.assertNotIn(("Lead", "Temporary Staffing", "New"), index)
+
+	def test_breach_logged_per_manager(self):
+		self.add_lead("L1", "New", hours_ago(30))
+
+		self.assertEqual(core.run(self.backend, NOW), 1)
+		self.assertEqual(
+			sorted(self.rows("select reporting_manager_email, stage from breach_log where record_id = 'L1'")),
+			[("boss1@example.com", "New"), ("boss2@example.com", "New")],
+		)
+		self.assertEqual(self.rows("select sla_status from record_state where record_id = 'L1'"), [("Breached",)])
+
+	def test_missing_hierarchy_logs_without_manager(self):
+		self.add_lead("L1", "New", hours_ago(30), owner="nobody@example.com")
+
+		core.run(self.backend, NOW)
+		self.assertEqual(self.rows("select reporting_manager_email from breach_log"), [("",)])
+
+	def test_at_risk_not_logged(self):
+		self.add_lead("L1", "New", hours_ago(20))
+
+		self.assertEqual(core.run(self.backend, NOW), 0)
+		self.assertEqual(self.rows("select count(*) from breach_log"), [(0,)])
+		self.assertEqual(self.rows("select sla_status, threshold from record_state"), [("At Risk", 75)])
+
+	def test_on_track_state_removed(self):
+		self.add_lead("L1", "New", hours_ago(20))
+		core.run(self.backend, NOW)
+
+		self.backend.conn.execute("update lead set status = 'Do Not Contact'")
+		core.run(self.backend, NOW + timedelta(minutes=1))
+		self.assertEqual(self.rows("select count(*) from record_state"), [(0,)])
+
+	def test_multi_status_logs_record_status(self):
+		self.add_lead("L1", "Nurturing", hours_ago(50))
+
+		core.run(self.backend, NOW)
+		self.assertEqual(self.rows("select stage from breach_log where record_id = 'L1'")[0], ("Nurturing",))
+
+	def test_converted_lead(self):
+		self.add_lead("L-NO-OPP", "Converted", hours_ago(100), modified=hours_ago(30))
+		self.add_lead("L-LATE-OPP", "Converted", hours_ago(100), modified=hours_ago(40))
+		self.add_lead("L-FAST-OPP", "Converted", hours_ago(100), modified=hours_ago(40))
+		self.backend.insert("opportunity", [
+			{"name": "O1", "owner": "owner@example.com", "status": "Open", "vertical": "Permanent Staffing",
+				"creation": hours_ago(5), "modified": NOW, "opportunity_from": "Lead", "party_name": "L-LATE-OPP"},
+			{"name": "O2", "owner": "owner@example.com", "status": "Open", "vertical": "Permanent Staffing",
+				"creation": hours_ago(35), "modified": NOW, "opportunity_from": "Lead", "party_name": "L-FAST-OPP"},
+		])
+
+		self.assertEqual(core.run(self.backend, NOW), 2)
+		self.assertEqual(
+			{r[0] for r in self.rows("select record_id from breach_log")}, {"L-NO-OPP", "L-LATE-OPP"}
+		)
+		# 5 of 24 hours, but an Opportunity exists so it is not at risk
+		self.assertEqual(self.rows("select count(*) from record_state where record_id = 'L-FAST-OPP'"), [(0,)])
+
+	def test_opportunity_stage(self):
+		self.backend.insert("opportunity", [
+			{"name": "O1", "owner": "owner@example.com", "status": "Quotation", "vertical": "Permanent Staffing",
+				"creation": hours_ago(200), "modified": hours_ago(80), "opportunity_from": "", "party_name": ""},
+		])
+
+		self.assertEqual(core.run(self.backend, NOW), 1)
+		self.assertEqual(self.rows("select doctype_name, stage from breach_log")[0], ("Opportunity", "Quotation"))
+
+	def test_vertical_filtering(self):
+		self.add_lead("L1", "New", hours_ago(30), vertical="Temporary Staffing")
+
+		self.assertEqual(core.run(self.backend, NOW), 0)
+
+	def test_duplicate_breach_prevention(self):
+		self.add_lead("L1", "New", hours_ago(30))
+
+		self.assertEqual(core.run(self.backend, NOW), 1)
+		self.assertEqual(core.run(self.backend, NOW + timedelta(hours=1)), 0)
+		self.assertEqual(self.rows("select count(*) from breach_log"), [(2,)])
+
+	def test_random_data_is_idempotent(self):
+		populate_random(self.backend, 2000, NOW, seed=7)
+
+		first = core.run(self.backend, NOW)
+		logs = self.rows("select count(*) from breach_log")
+		self.assertGreater(first, 0)
+		self.assertEqual(core.run(self.backend, NOW), 0)
+		self.assertEqual(self.rows("select count(*) from breach_log"), logs)
+
+
+try:
+	import pyarrow
+except ImportError:
+	pyarrow = None
+
+
+@unittest.skipUnless(pyarrow, "pyarrow is not installed")
+class TestSLASnapshot(unittest.TestCase):
+	def test_snapshot_partitions(self):
+		backend = SQLiteBackend()
+		populate_random(backend, 1000, NOW, seed=3)
+		core.run(backend, NOW)
+
+		partitions = snapshot.build_partitions(backend.get_active_rules(), backend, NOW)
+		with tempfile.TemporaryDirectory() as base_dir:
+			day_dir = snapshot.write_snapshot(partitions, base_dir, NOW)
+			path = os.path.join(day_dir, "vertical=permanent_staffing", "part-0.arrow")
+			table = pyarrow.ipc.open_file(pyarrow.memory_map(path)).read_all()
+
+			self.assertEqual(table.num_rows, len(partitions["Permanent Staffing"]))
+			self.assertEqual(set(table.column("vertical").to_pylist()), {"Permanent Staffing"})
+			rows = table.to_pylist()
+			self.assertTrue(all(r["breach_logged"] for r in rows if r["sla_status"] == core.BREACHED))
+
+			# Same day again: replaced, no leftovers
+			self.assertEqual(snapshot.write_snapshot(partitions, base_dir, NOW), day_dir)
+			self.assertEqual(os.listdir(base_dir), [os.path.basename(day_dir)])
+
+			snapshot.prune_snapshots(base_dir, NOW + timedelta(days=40), 30)
+			self.assertFalse(os.path.exists(day_dir))
@@ -284,6 +284,221 @@ class TestSLAManagement(FrappeTestCase):
 
 		self.assertEqual(breach_count_before, breach_count_after, "Different vertical should not trigger breach")
 
+	def test_11_replica_reads_fallback(self):
+		"""Test Case 11: Replica reads stay on primary when not configured or lagging"""
+		from unittest.mock import patch
+		from sla_management.utils import replica
+
+		primary_db = frappe.local.db
+
+		with patch.dict(frappe.conf, {"read_from_replica": 0}):
+			with replica.replica_reads() as on_replica:
+				self.assertFalse(on_replica)
+				self.assertIs(frappe.local.db, primary_db)
+
+		# String, as stored by `bench set-config`
+		with patch.dict(frappe.conf, {"read_from_replica": 1, "sla_replica_max_lag": "60"}), \
+			patch.object(frappe, "connect_replica", side_effect=lambda: self._fake_replica(primary_db)), \
+			patch.object(replica, "get_replica_lag", return_value=600):
+			with replica.replica_reads() as on_replica:
+				self.assertFalse(on_replica)
+				self.assertIs(frappe.local.db, primary_db)
+
+		self.assertIs(frappe.local.db, primary_db)
+
+	def test_12_replica_reads_unknown_lag(self):
+		"""Test Case 12: Unmeasurable replica lag falls back to primary unless trusted"""
+		from unittest.mock import patch
+		from sla_management.utils import replica
+
+		primary_db = frappe.local.db
+
+		with patch.dict(frappe.conf, {"read_from_replica": 1}), \
+			patch.object(frappe, "connect_replica", side_effect=lambda: self._fake_replica(primary_db)), \
+			patch.object(replica, "get_replica_lag", return_value=None):
+			with replica.replica_reads() as on_replica:
+				self.assertFalse(on_replica)
+				self.assertIs(frappe.local.db, primary_db)
+
+			with patch.dict(frappe.conf, {"sla_replica_trust_unknown_lag": 1}):
+				with replica.replica_reads() as on_replica:
+					self.assertTrue(on_replica)
+					self.assertIsNot(frappe.local.db, primary_db)
+
+		self.assertIs(frappe.local.db, primary_db)
+
+	def test_13_at_risk_state(self):
+		"""Test Case 13: At Risk tier written to SLA Record State, not SLA Breach Log"""
+		sla_rule = create_test_sla_rule(
+			self.test_vertical, "Lead", "status",
+			self.test_stage, self.test_sla_hours, active=1
+		)
+		sla_rule.warning_thresholds = "75, 90"
+		sla_rule.save()
+
+		lead = create_test_lead("Test At Risk Lead", self.test_stage, self.test_vertical)
+		# The checker scans custom_vertical; 20 of 24 hours used = 83%
+		frappe.db.set_value("Lead", lead.name, {
+			"custom_vertical": self.test_vertical,
+			"creation": add_to_date(now_datetime(), hours=-20)
+		}, update_modified=False)
+
+		from sla_management.scripts.sla_checker import sla_checker
+		sla_checker()
+
+		state = frappe.db.get_value("SLA Record State", f"Lead-{lead.name}", ["sla_status", "threshold"], as_dict=True)
+		self.assertEqual(state.sla_status, "At Risk")
+		self.assertEqual(state.threshold, 75)
+		self.assertEqual(frappe.db.count("SLA Breach Log", {"record_id": lead.name}), 0)
+
+	def test_14_scheduled_checker_defers_to_bench_runner(self):
+		"""Test Case 14: Per-site hourly job is skipped when the bench runner is enabled"""
+		from unittest.mock import patch
+		from sla_management.scripts import sla_checker
+
+		with patch.dict(frappe.conf, {"sla_bench_runner": 1}), \
+			patch.object(sla_checker, "sla_checker") as run:
+			self.assertEqual(sla_checker.scheduled_sla_checker(), 0)
+			run.assert_not_called()
+
+	def test_15_bulk_stage_tracking(self):
+		"""Test Case 15: Bulk mode stamps last_stage_change_on in one batched UPDATE"""
+		from unittest.mock import patch
+		from sla_management.utils import document_events
+
+		with patch.object(document_events, "now_datetime", wraps=now_datetime) as stamp:
+			with document_events.bulk_stage_tracking():
+				leads = [create_test_lead(f"Bulk Lead {i}", "New", self.test_vertical) for i in range(3)]
+				self.assertIsNone(leads[0].last_stage_change_on)
+
+			# One timestamp for the whole batch
+			self.assertEqual(stamp.call_count, 1)
+
+		stamps = {frappe.db.get_value("Lead", lead.name, "last_stage_change_on") for lead in leads}
+		self.assertEqual(len(stamps), 1)
+		self.assertIsNotNone(stamps.pop())
+
+	def test_16_import_stage_tracking(self):
+		"""Test Case 16: Data Import stamps in memory from one timestamp, no extra UPDATE"""
+		from unittest.mock import patch
+		from sla_management.utils import document_events
+
+		frappe.flags.in_import = True
+		frappe.flags.sla_import_timestamp = None
+		try:
+			with patch.object(document_events, "now_datetime", wraps=now_datetime) as stamp, \
+				patch.object(document_events, "flush_stage_changes") as flush:
+				leads = [create_test_lead(f"Import Lead {i}", "New", self.test_vertical) for i in range(3)]
+				frappe.db.commit()
+
+			self.assertEqual(stamp.call_count, 1)
+			flush.assert_not_called()
+		finally:
+			frappe.flags.in_import = False
+			frappe.flags.sla_import_timestamp = None
+
+		stamps = {frappe.db.get_value("Lead", lead.name, "last_stage_change_on") for lead in leads}
+		self.assertEqual(len(stamps), 1)
+		self.assertIsNotNone(stamps.pop())
+
+	def test_17_breach_counters_debounced(self):
+		"""Test Case 17: A burst of breaches results in one realtime push"""
+		from unittest.mock import patch
+		from sla_management.utils import breach_counters
+
+		frappe.cache.delete_value("sla_breach_counters:push_lock")
+		counter = breach_counters.BreachCounter(debounce_seconds=3600)
+		# Increments below have no matching logs, so the hash must exist before the flush
+		breach_counters.rebuild_counters(breach_counters.getdate(now_datetime()))
+
+		with patch.object(breach_counters.frappe, "publish_realtime") as publish:
+			before = breach_counters.get_breach_counters()["counts"]
+			for _ in range(1000):
+				counter.add(self.test_vertical, self.test_stage)
+			self.assertEqual(publish.call_count, 0)
+
+			counter.flush(force=True)
+			self.assertEqual(publish.call_count, 1)
+			self.assertEqual(publish.call_args.kwargs["doctype"], "SLA Breach Log")
+
+		counts = breach_counters.get_breach_counters()["counts"]
+		self.assertEqual(
+			counts[self.test_vertical][self.test_stage],
+			before.get(self.test_vertical, {}).get(self.test_stage, 0) + 1000,
+		)
+
+	def test_18_sla_indexes(self):
+		"""Test Case 18: SLA indexes are created and the self-check reports every hot query"""
+		from sla_management.utils.indexes import check_sla_indexes, ensure_sla_indexes
+
+		ensure_sla_indexes()
+		self.assertTrue(frappe.db.has_index("tabSLA Breach Log", "sla_record_stage"))
+		if frappe.db.has_column("Opportunity", "custom_vertical"):
+			# Same columns as the Lead indexes, separate names
+			self.assertTrue(frappe.db.has_index("tabOpportunity", "sla_opportunity_vertical_status_creation"))
+			self.assertTrue(frappe.db.has_index("tabOpportunity", "sla_opportunity_vertical_status_modified"))
+		self.assertTrue(frappe.db.has_index("tabOpportunity", "sla_party_name_from"))
+
+		labels = [r.label for r in check_sla_indexes()]
+		self.assertIn("Lead bucket", labels)
+		self.assertIn("Breach log dedup", labels)
+
+	def test_19_summary_dispatched_at_local_morning(self):
+		"""Test Case 19: Digests are enqueued per manager at their local summary hour"""
+		from unittest.mock import patch
+		from zoneinfo import ZoneInfo
+		from sla_management.scripts import sla_daily_summary as summary
+
+		frappe.get_doc({
+			"doctype": "SLA Breach Log",
+			"vertical": self.test_vertical,
+			"doctype_name": "Lead",
+			"record_id": "TEST-TZ-001",
+			"breached_by": self.test_user,
+			"stage": self.test_stage,
+			"hours_exceeded": 1.5,
+			# Before the start of the previous hour, i.e. inside the window used below
+			"breached_on": add_to_date(now_datetime(), hours=-2),
+			"reporting_manager_email": " TZ.Manager@Example.com"
+		}).insert(ignore_permissions=True)
+
+		system_tz = ZoneInfo(frappe.utils.get_system_timezone())
+		local_hour = summary.get_local_time(now_datetime(), None, system_tz).hour
+		frappe.db.delete("SLA Summary Delivery", {"name": "tz.manager@example.com"})
+
+		def manager_jobs(enqueue):
+			return [c.kwargs for c in enqueue.call_args_list if c.kwargs["manager_email"] == "tz.manager@example.com"]
+
+		with patch.object(summary.frappe, "enqueue") as enqueue, \
+			patch.object(summary.frappe, "sendmail") as sendmail:
+			if local_hour < 23:
+				with patch.dict(frappe.conf, {"sla_summary_hour": local_hour + 1}):
+					summary.dispatch_daily_summaries()
+				self.assertEqual(manager_jobs(enqueue), [])
+
+			# Missed hour: still sent later the same local day, until a digest went out
+			with patch.dict(frappe.conf, {"sla_summary_hour": max(local_hour - 1, 0)}):
+				summary.dispatch_daily_summaries()
+				# Survives clear-cache / migrate
+				frappe.clear_cache()
+				summary.dispatch_daily_summaries()
+				self.assertEqual(len(manager_jobs(enqueue)), 2)
+
+				job = manager_jobs(enqueue)[0]
+				self.assertEqual(summary.send_manager_summary(**job), 1)
+				sendmail.assert_called_once()
+
+				summary.dispatch_daily_summaries()
+				self.assertEqual(len(manager_jobs(enqueue)), 2)
+
+	def _fake_replica(self, primary_db):
+		from unittest.mock import MagicMock
+
+		frappe.local.replica_db = MagicMock()
+		frappe.local.primary_db = primary_db
+		frappe.local.db = frappe.local.replica_db
+		return True
+
 
 class TestSLAVerticalWise(FrappeTestCase):
 	"""Test cases for each vertical"""
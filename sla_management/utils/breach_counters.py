@@ -0,0 +1,151 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+"""
+Live breach counters per vertical and stage for supervisor dashboards.
+
+Counts for the current day are kept in a Redis hash and changes are pushed with
+`frappe.publish_realtime("sla_breach_counters", ...)` to the SLA Breach Log
+doctype room, debounced so that a burst of breaches results in a handful of
+pushes. Dashboards load the initial counts with `get_breach_counters`, subscribe
+to the doctype room and then only listen.
+"""
+
+import time
+
+import frappe
+from frappe.utils import flt, get_datetime, getdate, now_datetime
+
+REALTIME_EVENT = "sla_breach_counters"
+DEFAULT_DEBOUNCE_SECONDS = 5
+# Keep yesterday's hash around for late readers
+COUNTER_TTL = 2 * 24 * 60 * 60
+
+
+def _counter_key(day):
+	return frappe.cache.make_key(f"sla_breach_counters:{day}")
+
+
+def _redis():
+	# Raw redis-py commands on already site-prefixed keys (RedisWrapper helpers
+	# would prefix again and pickle hash values)
+	return frappe.cache.pipeline(transaction=False)
+
+
+def _counters_exist(key):
+	return bool(_redis().exists(key).execute()[0])
+
+
+def _field(vertical, stage):
+	return f"{vertical or ''}|{stage or ''}"
+
+
+def count_breaches(day):
+	"""The day's breach logs as {(vertical, stage): count}, one grouped query"""
+	# Primary on purpose: a lagging replica would miss the logs just committed
+	rows = frappe.get_all(
+		"SLA Breach Log",
+		filters={"breached_on": [">=", get_datetime(day)]},
+		fields=["vertical", "stage", "count(*) as breaches"],
+		group_by="vertical, stage",
+	)
+	return {(row.vertical, row.stage): row.breaches for row in rows}
+
+
+def rebuild_counters(day):
+	"""
+	Recount the day's breach logs into the hash. Only called by the writer
+	(BreachCounter.flush), which then drops its pending counts: a rebuild from
+	anywhere else could already include logs the writer has yet to add.
+	"""
+	key = _counter_key(day)
+	counts = count_breaches(day)
+
+	pipe = frappe.cache.pipeline()
+	pipe.delete(key)
+	for (vertical, stage), breaches in counts.items():
+		pipe.hset(key, _field(vertical, stage), breaches)
+	pipe.hset(key, "|__built__", 1)
+	pipe.expire(key, COUNTER_TTL)
+	pipe.execute()
+
+
+def read_counters(day):
+	counts = {}
+	for field, value in _redis().hgetall(_counter_key(day)).execute()[0].items():
+		field = frappe.safe_decode(field)
+		if field == "|__built__":
+			continue
+		vertical, stage = field.split("|", 1)
+		counts.setdefault(vertical, {})[stage] = int(value)
+	return counts
+
+
+class BreachCounter:
+	"""
+	Buffers breach counts in-process. `flush` writes them to Redis and publishes
+	the new totals at most once per debounce interval, across all processes of
+	the site; `flush(force=True)` always publishes (end of a run).
+	"""
+
+	def __init__(self, debounce_seconds=None):
+		if debounce_seconds is None:
+			# set-config stores numbers as strings
+			debounce_seconds = flt(frappe.conf.get("sla_realtime_debounce_seconds", DEFAULT_DEBOUNCE_SECONDS))
+		self.debounce_seconds = debounce_seconds
+		self.pending = {}
+		self.unpublished = False
+		self.last_flush = time.monotonic()
+
+	def add(self, vertical, stage, count=1):
+		field = _field(vertical, stage)
+		self.pending[field] = self.pending.get(field, 0) + count
+		if time.monotonic() - self.last_flush >= self.debounce_seconds:
+			self.flush()
+
+	def flush(self, force=False):
+		self.last_flush = time.monotonic()
+		day = getdate(now_datetime())
+
+		if self.pending:
+			key = _counter_key(day)
+			if _counters_exist(key):
+				pipe = frappe.cache.pipeline()
+				for field, count in self.pending.items():
+					pipe.hincrby(key, field, count)
+				pipe.expire(key, COUNTER_TTL)
+				pipe.execute()
+			else:
+				# First write of the day (or Redis was flushed) - committed logs already include ours
+				rebuild_counters(day)
+			self.pending = {}
+			self.unpublished = True
+
+		if not self.unpublished:
+			return
+
+		# Cross-process debounce: one push per interval, unless forced at the end of a run
+		lock = frappe.cache.make_key("sla_breach_counters:push_lock")
+		acquired = _redis().set(lock, 1, nx=True, ex=max(1, int(self.debounce_seconds))).execute()[0]
+		if force or acquired:
+			# Doctype room: only users with SLA Breach Log read permission receive it
+			frappe.publish_realtime(
+				REALTIME_EVENT, {"date": str(day), "counts": read_counters(day)}, doctype="SLA Breach Log"
+			)
+			self.unpublished = False
+
+
+@frappe.whitelist()
+def get_breach_counters():
+	"""Today's breach counts as {vertical: {stage: count}}"""
+	frappe.has_permission("SLA Breach Log", "read", throw=True)
+
+	day = getdate(now_datetime())
+	if _counters_exist(_counter_key(day)):
+		return {"date": str(day), "counts": read_counters(day)}
+
+	# No hash yet: count without writing it, the next checker flush builds it
+	counts = {}
+	for (vertical, stage), breaches in count_breaches(day).items():
+		counts.setdefault(vertical or "", {})[stage or ""] = breaches
+	return {"date": str(day), "counts": counts}
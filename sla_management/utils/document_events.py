@@ -1,15 +1,33 @@
 # Copyright (c) 2024, SLA Management Team and contributors
 # For license information, please see license.txt
 
+from contextlib import contextmanager
+
 import frappe
 from frappe.utils import now_datetime
 
+STAGE_FIELDS = {"Lead": "status", "Opportunity": "stage"}
+
+# Max names per batched UPDATE
+STAMP_CHUNK_SIZE = 1000
+
 
 def update_last_stage_change_on(doc, method=None):
 	"""
 	Update last_stage_change_on when stage/status changes.
 	Works for both Lead and Opportunity.
 	"""
+	if frappe.flags.sla_bulk_stage_tracking:
+		queue_stage_change(doc)
+		return
+
+	if frappe.flags.in_import:
+		# Data Import commits after every row, so a batched UPDATE per commit would be
+		# an extra statement per row; set the field in the row's own write instead
+		if stage_changed(doc):
+			doc.last_stage_change_on = get_import_timestamp()
+		return
+
 	if doc.get("__islocal"):
 		# New document - set initial timestamp
 		doc.last_stage_change_on = now_datetime()
@@ -17,10 +35,73 @@ def update_last_stage_change_on(doc, method=None):
 		# Existing document - check if stage changed
 		# For Lead, check 'status' field
 		# For Opportunity, check 'stage' field
-		stage_field = "status" if doc.doctype == "Lead" else "stage"
-		
+		stage_field = STAGE_FIELDS.get(doc.doctype, "stage")
+
 		if doc.has_value_changed(stage_field):
 			doc.last_stage_change_on = now_datetime()
 
 
+def stage_changed(doc):
+	return doc.get("__islocal") or doc.has_value_changed(STAGE_FIELDS.get(doc.doctype, "stage"))
+
+
+def get_import_timestamp():
+	"""One timestamp for the whole import instead of one now_datetime() per row"""
+	if not frappe.flags.sla_import_timestamp:
+		frappe.flags.sla_import_timestamp = now_datetime()
+	return frappe.flags.sla_import_timestamp
+
+
+def queue_stage_change(doc):
+	if not stage_changed(doc):
+		return
+
+	pending = frappe.flags.sla_pending_stage_changes
+	if pending is None:
+		pending = frappe.flags.sla_pending_stage_changes = {}
+		# Runs inside the transaction, after the documents have been written
+		frappe.db.before_commit.add(flush_stage_changes)
+		frappe.db.after_rollback.add(discard_stage_changes)
 
+	pending.setdefault(doc.doctype, set()).add(doc.name)
+
+
+def flush_stage_changes():
+	"""Stamp all queued records with one timestamp, one UPDATE per doctype and chunk"""
+	pending = frappe.flags.sla_pending_stage_changes
+	frappe.flags.sla_pending_stage_changes = None
+	if not pending:
+		return
+
+	timestamp = now_datetime()
+	for doctype, names in pending.items():
+		names = list(names)
+		for i in range(0, len(names), STAMP_CHUNK_SIZE):
+			frappe.db.sql(
+				f"update `tab{doctype}` set last_stage_change_on = %s where name in %s",
+				(timestamp, names[i : i + STAMP_CHUNK_SIZE]),
+			)
+
+
+def discard_stage_changes():
+	frappe.flags.sla_pending_stage_changes = None
+
+
+@contextmanager
+def bulk_stage_tracking():
+	"""
+	Bulk mode for integrations and migrations inserting/updating many Leads or
+	Opportunities: last_stage_change_on is stamped in batched UPDATEs at commit
+	(or when the block exits) instead of per document.
+
+		with bulk_stage_tracking():
+			for row in rows:
+				frappe.get_doc(row).insert()
+	"""
+	previous = frappe.flags.sla_bulk_stage_tracking
+	frappe.flags.sla_bulk_stage_tracking = True
+	try:
+		yield
+		flush_stage_changes()
+	finally:
+		frappe.flags.sla_bulk_stage_tracking = previous
@@ -0,0 +1,148 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import add_days, now_datetime
+
+from sla_management.utils.rule_registry import get_active_rules
+
+# (doctype, columns, index name) for the queries the SLA engine runs every hour.
+# Names must be unique across tables: Postgres index names are per schema.
+SLA_INDEXES = [
+	("Lead", ["custom_vertical", "status", "creation"], "sla_lead_vertical_status_creation"),
+	("Lead", ["custom_vertical", "status", "modified"], "sla_lead_vertical_status_modified"),
+	("Opportunity", ["custom_vertical", "status", "creation"], "sla_opportunity_vertical_status_creation"),
+	("Opportunity", ["custom_vertical", "status", "modified"], "sla_opportunity_vertical_status_modified"),
+	("Opportunity", ["party_name", "opportunity_from"], "sla_party_name_from"),
+	# breached_on is indexed through search_index in the doctype
+	("SLA Breach Log", ["record_id", "stage"], "sla_record_stage"),
+	("SLA Breach Log", ["reporting_manager_email", "breached_on"], "sla_manager_breached_on"),
+]
+
+# Shared names used before, replaced by the table-specific ones above
+LEGACY_INDEXES = [
+	("Lead", "sla_vertical_status_creation"),
+	("Lead", "sla_vertical_status_modified"),
+	("Opportunity", "sla_vertical_status_creation"),
+	("Opportunity", "sla_vertical_status_modified"),
+]
+
+
+def ensure_sla_indexes():
+	"""
+	Create missing SLA indexes. Runs after install and after every migrate so
+	indexes dropped by a table rebuild come back.
+	"""
+	drop_legacy_indexes()
+
+	for doctype, columns, index_name in SLA_INDEXES:
+		if not all(frappe.db.has_column(doctype, column) for column in columns):
+			# e.g. custom_vertical not created on this site yet
+			frappe.logger().warning(f"SLA: skipping index {index_name} on {doctype}, missing columns")
+			continue
+		frappe.db.add_index(doctype, columns, index_name)
+
+
+def drop_legacy_indexes():
+	for doctype, index_name in LEGACY_INDEXES:
+		if not frappe.db.has_index(f"tab{doctype}", index_name):
+			continue
+		if frappe.db.db_type == "postgres":
+			frappe.db.sql_ddl(f'drop index if exists "{index_name}"')
+		else:
+			frappe.db.sql_ddl(f"alter table `tab{doctype}` drop index `{index_name}`")
+
+
+def get_hot_queries():
+	"""(label, SQL) for the hot SLA queries, built the same way the engine builds them"""
+	rules = get_active_rules()
+	vertical = rules[0].vertical if rules else "Permanent Staffing"
+	record_fields = ["name", "owner", "status", "custom_vertical as vertical"]
+
+	return [
+		(
+			"Lead bucket",
+			frappe.get_all(
+				"Lead",
+				filters={"custom_vertical": vertical, "status": ["in", ["Working", "Nurturing"]]},
+				fields=[*record_fields, "creation as sla_start"],
+				run=0,
+			),
+		),
+		(
+			"Opportunity bucket",
+			frappe.get_all(
+				"Opportunity",
+				filters={"custom_vertical": vertical, "status": ["in", ["Quotation"]]},
+				fields=[*record_fields, "modified as sla_start"],
+				run=0,
+			),
+		),
+		(
+			"Converted Lead opportunities",
+			frappe.get_all(
+				"Opportunity",
+				filters={"opportunity_from": "Lead", "party_name": ["in", ["CRM-LEAD-0001"]]},
+				fields=["party_name", "min(creation) as creation"],
+				group_by="party_name",
+				run=0,
+			),
+		),
+		(
+			"Breach log dedup",
+			frappe.get_all(
+				"SLA Breach Log",
+				filters={"record_id": ["in", ["CRM-LEAD-0001"]]},
+				fields=["record_id", "stage", "vertical", "reporting_manager_email"],
+				run=0,
+			),
+		),
+		(
+			"Daily summary window",
+			frappe.get_all(
+				"SLA Breach Log",
+				filters={"breached_on": [">=", add_days(now_datetime(), -1)]},
+				fields=["name", "reporting_manager_email"],
+				run=0,
+			),
+		),
+		(
+			"Manager summary window",
+			frappe.get_all(
+				"SLA Breach Log",
+				filters={
+					"reporting_manager_email": ["in", ["manager@example.com"]],
+					"breached_on": ["between", [add_days(now_datetime(), -1), now_datetime()]],
+				},
+				fields=["name", "record_id", "breached_on"],
+				run=0,
+			),
+		),
+	]
+
+
+def explain(query):
+	"""Returns (uses_index, detail) for `query`"""
+	if frappe.db.db_type == "postgres":
+		plan = "\n".join(row[0] for row in frappe.db.sql(f"explain {query}"))
+		return "Seq Scan" not in plan, plan
+
+	rows = frappe.db.sql(f"explain {query}", as_dict=True)
+	uses_index = all(row.get("key") and row.get("type") != "ALL" for row in rows)
+	detail = "; ".join(
+		f"{row.get('table')}: type={row.get('type')} key={row.get('key')} "
+		f"possible_keys={row.get('possible_keys')} rows={row.get('rows')}"
+		for row in rows
+	)
+	return uses_index, detail
+
+
+def check_sla_indexes():
+	"""EXPLAIN every hot SLA query, warn about the ones not using an index"""
+	results = []
+	for label, query in get_hot_queries():
+		uses_index, detail = explain(query)
+		results.append(frappe._dict(label=label, uses_index=uses_index, detail=detail))
+		if not uses_index:
+			frappe.logger().warning(f"SLA query '{label}' is not using an index: {detail}")
+	return results
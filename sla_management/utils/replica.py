@@ -0,0 +1,120 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import flt, get_datetime
+
+# Replica lag (seconds) beyond which SLA reads fall back to the primary.
+DEFAULT_MAX_REPLICA_LAG = 300
+
+# Written by every scheduled job run, so its latest row tracks replication progress
+HEARTBEAT_TABLE = "tabScheduled Job Log"
+
+
+def get_replica_lag(primary_db=None):
+	"""
+	Return how far the current connection lags behind the primary, in seconds.
+
+	Uses the replication status when the site user may read it, otherwise (no
+	REPLICATION CLIENT / REPLICA MONITOR privilege, the usual case) compares the
+	latest Scheduled Job Log row on `primary_db` and the replica.
+
+	Returns None when the lag cannot be measured and infinity when replication
+	is stopped.
+	"""
+	lag = _replication_status_lag()
+	if lag is None and primary_db is not None:
+		lag = _heartbeat_lag(primary_db)
+	return lag
+
+
+def _replication_status_lag():
+	try:
+		if frappe.db.db_type == "postgres":
+			rows = frappe.db.sql(
+				"select extract(epoch from now() - pg_last_xact_replay_timestamp()) as lag", as_dict=True
+			)
+			lag = rows[0].lag if rows else None
+			return None if lag is None else float(lag)
+
+		rows = frappe.db.sql("SHOW SLAVE STATUS", as_dict=True)
+	except Exception:
+		return None
+
+	if not rows:
+		return None
+
+	lag = rows[0].get("Seconds_Behind_Master")
+	return float("inf") if lag is None else float(lag)
+
+
+def _heartbeat_lag(primary_db):
+	query = f"select max(creation) from `{HEARTBEAT_TABLE}`"
+	try:
+		primary_latest = primary_db.sql(query)[0][0]
+		replica_latest = frappe.db.sql(query)[0][0]
+	except Exception:
+		return None
+
+	if primary_latest is None:
+		return None
+	if replica_latest is None:
+		return float("inf")
+	# A lower bound: exact while the primary keeps writing job logs
+	return max(0.0, (get_datetime(primary_latest) - get_datetime(replica_latest)).total_seconds())
+
+
+def _restore_primary():
+	primary_db = getattr(frappe.local, "primary_db", None)
+	if primary_db is None:
+		return
+
+	frappe.local.replica_db.close()
+	frappe.local.db = primary_db
+	del frappe.local.primary_db
+	del frappe.local.replica_db
+
+
+@contextmanager
+def replica_reads(max_lag=None):
+	"""
+	Route `frappe.db` reads inside the block to the read replica.
+
+	Only active when `read_from_replica` is set in site config. Falls back to the
+	primary when the replica is lagging more than `sla_replica_max_lag` seconds
+	(site config, default 300), or when the lag cannot be measured unless
+	`sla_replica_trust_unknown_lag` is set. Yields True when reads go to the replica.
+	Never write inside this block.
+	"""
+	if not frappe.conf.get("read_from_replica"):
+		yield False
+		return
+
+	if not frappe.connect_replica():
+		# Nested call, the outer block already swapped connections
+		yield True
+		return
+
+	try:
+		if max_lag is None:
+			# set-config stores "120" as a string
+			max_lag = flt(frappe.conf.get("sla_replica_max_lag") or DEFAULT_MAX_REPLICA_LAG)
+
+		lag = get_replica_lag(frappe.local.primary_db)
+		if lag is None:
+			on_replica = bool(frappe.conf.get("sla_replica_trust_unknown_lag"))
+			if not on_replica:
+				frappe.logger().warning("SLA: replica lag unknown, reading from primary")
+		else:
+			on_replica = lag <= max_lag
+			if not on_replica:
+				frappe.logger().warning(f"SLA: replica lag {lag}s exceeds {max_lag}s, reading from primary")
+
+		if not on_replica:
+			_restore_primary()
+
+		yield on_replica
+	finally:
+		_restore_primary()
@@ -0,0 +1,85 @@
+# Copyright (c) 2024, SLA Management Team and contributors
+# For license information, please see license.txt
+
+"""
+Cached registry of active SLA Rules.
+
+Rules change a few times a month but are read on every checker run and every
+SLA lookup. The rule set is cached in Redis and in each process under a version
+token that SLA Rule bumps on every save or delete. A lookup costs one cache read
+of the version; the database is only queried after a change.
+
+	rules = get_registry().get("Lead", "Permanent Staffing", "Working")
+"""
+
+import frappe
+
+from sla_management.engine.core import index_rules
+
+VERSION_KEY = "sla_rule_registry:version"
+RULES_KEY = "sla_rule_registry:rules"
+# Payloads of old versions expire on their own
+RULES_TTL = 7 * 24 * 60 * 60
+
+# {site: RuleRegistry}, reused across requests and jobs of a worker process
+_process_cache = {}
+
+
+class RuleRegistry:
+	def __init__(self, version, rules):
+		self.version = version
+		self.rules = rules
+		self.by_key = index_rules(rules)
+
+	def get(self, applies_to, vertical, stage):
+		"""Active rules for a record of `applies_to` in `vertical` at `stage`"""
+		return self.by_key.get((applies_to, vertical, stage), [])
+
+
+def get_registry():
+	version = frappe.cache.get_value(VERSION_KEY)
+	if version is None:
+		version = _new_version()
+
+	registry = _process_cache.get(frappe.local.site)
+	if registry and registry.version == version:
+		return registry
+
+	rules_key = f"{RULES_KEY}:{version}"
+	rules = frappe.cache.get_value(rules_key)
+	if rules is None:
+		rules = _load_rules()
+		frappe.cache.set_value(rules_key, rules, expires_in_sec=RULES_TTL)
+
+	registry = _process_cache[frappe.local.site] = RuleRegistry(version, rules)
+	return registry
+
+
+def get_active_rules():
+	return get_registry().rules
+
+
+def get_rules(applies_to, vertical, stage):
+	return get_registry().get(applies_to, vertical, stage)
+
+
+def _load_rules():
+	# Primary on purpose: a lagging replica would cache the old rules under the new version
+	db = getattr(frappe.local, "primary_db", None) or frappe.db
+	return db.sql("select * from `tabSLA Rule` where active = 1 order by name", as_dict=True)
+
+
+def _new_version():
+	version = frappe.generate_hash(length=10)
+	frappe.cache.set_value(VERSION_KEY, version)
+	return version
+
+
+def invalidate_rule_registry():
+	"""
+	Called from SLA Rule on_update/on_trash. Bumps the version now (same
+	transaction sees the change) and again after commit, so that a worker that
+	reloaded the rules before the commit does not keep them.
+	"""
+	_new_version()
+	frappe.db.after_commit.add(_new_version)